@@ -22,7 +22,7 @@ source.include_exts = py,png,jpg,kv,atlas,json,txt,ttf,wav,ico,ogg,otf,mp3
 #source.exclude_exts = spec
 
 # (list) List of directory to exclude (let empty to not exclude anything)
-source.exclude_dirs = test, bin, .buildozer, data/collection, venv, PlayStore, reports, .vscode, resources/images/ghost_textures, resources/images/map_textures
+source.exclude_dirs = test, bin, .buildozer, data/collection, venv, PlayStore, reports, .vscode, resources/images/ghost_textures, resources/images/map_textures, resources/start_logo
 
 # (list) List of exclusions using pattern matching
 # Do not prefix with './'
@@ -12,6 +12,14 @@ Main module of the generator of dialogs.
 
 import os
 import time
+from importlib import import_module
+
+### Startup trace ###
+
+# Started before the other imports to measure them
+from tools.tools_profiler import profiler
+profiler.start_from_environment()
+profiler.enter_phase("imports")
 
 ### Kivy imports ###
 
@@ -19,7 +27,11 @@ from kivy.app import App
 from kivy.uix.screenmanager import ScreenManager, NoTransition, Screen
 from kivy.lang import Builder
 from kivy.uix.widget import Widget
+from kivy.uix.image import Image
+from kivy.uix.progressbar import ProgressBar
 from kivy.clock import Clock
+from kivy.loader import Loader
+from kivy.core.image import Image as CoreImage
 
 
 ### Module imports ###
@@ -28,22 +40,17 @@ from tools.tools_constants import (
     PATH_KIVY_FOLDER,
     PATH_IMAGES,
     SPACE_KEY,
-    FPS,
     PATH_LOGO,
+    PATH_LOGO_ATLAS,
+    PATH_ATLAS,
+    LOGO_FPS,
+    LOGO_FRAMES_AHEAD,
+    PRELOAD_SCREENS,
+    DICT_SCREENS,
+    LIST_WARM_UP_SCREENS,
     DEBUG_MODE,
     MOBILE_MODE
 )
-from tools.tools_world_explorer import (
-    WorldExplorerScreen,
-    load_texture,
-    LogoTextureWidget
-)
-from screens import (
-    MenuScreen,
-    SettingsScreen,
-    GameOverScreen,
-    CollectionScreen
-)
 from tools.tools_kivy import (
     color_label,
     background_color,
@@ -52,18 +59,26 @@ from tools.tools_kivy import (
 from tools.tools_sound import (
     music_mixer
 )
-
-
-def change_window_size(*args):
-    global WINDOW_SIZE, SCREEN_RATIO
-
-    # Compute the size of one tile in pixel
-    WINDOW_SIZE = Window.size
-    SCREEN_RATIO = WINDOW_SIZE[0] / WINDOW_SIZE[1]
-
-
-Window.bind(on_resize=change_window_size)
-change_window_size()
+from tools.tools_viewport import (
+    viewport
+)
+from tools.tools_basis import (
+    load_json_file
+)
+from tools.tools_assets import (
+    prefetch_screen,
+    asset_preloader
+)
+from tools.tools_persistence import (
+    persistence
+)
+from tools.tools_checkpoint import (
+    run_checkpoint
+)
+from tools.tools_replay import (
+    replay_recorder,
+    replay_player
+)
 
 # Set the fullscreen
 if not MOBILE_MODE:
@@ -76,40 +91,147 @@ if not MOBILE_MODE:
 ###############
 
 
+class LogoTextureWidget(Image):
+    def __init__(self, texture, **kwargs):
+        super().__init__(**kwargs)
+        self.allow_stretch = True
+        self.keep_ratio = False
+        self.texture = texture
+
+
 class LogoScreen(Screen):
     def __init__(self, **kw):
         super().__init__(**kw)
 
     def init_screen(self):
-        self.list_textures = self.load_logo_textures()
+        self.list_frames = self.load_logo_frames()
+        self.dict_pages = {}
         self.counter_texture = 0
+        self.logo_start_time = time.perf_counter()
+
+        # Decode the first page directly to display the first frame at once
+        first_page = self.list_frames[0][0]
+        self.dict_pages[first_page] = CoreImage(first_page)
+
         self.logo_image = LogoTextureWidget(
-            size_hint=(0.5, 0.5 * SCREEN_RATIO),
+            size_hint=(0.5, 0.5 * viewport.screen_ratio),
             pos_hint={"center_x": 0.5, "center_y": 0.5},
-            texture=self.list_textures[self.counter_texture])
+            texture=self.get_frame_texture(self.counter_texture))
         self.logo_image.keep_ratio = True
         self.add_widget(self.logo_image)
-        self.loading_logo = Clock.schedule_interval(self.update, 1 / FPS)
 
-    def load_logo_textures(self):
+        # Progress of the loading of the assets of the game
+        self.progress_bar = ProgressBar(
+            max=1,
+            value=asset_preloader.progress,
+            size_hint=(0.3, 0.02),
+            pos_hint={"center_x": 0.5, "y": 0.1})
+        self.add_widget(self.progress_bar)
+        asset_preloader.bind(on_progress=self.on_preload_progress)
+
+        self.loading_logo = Clock.schedule_interval(self.update, 1 / LOGO_FPS)
+        Clock.schedule_once(self.on_first_frame)
+
+    def on_first_frame(self, *args):
+        profiler.mark("logo_first_frame")
+        profiler.enter_phase("logo_animation")
+        self.logo_start_time = time.perf_counter()
+
+        # Load the assets of the game while the logo is playing
+        asset_preloader.start(PRELOAD_SCREENS)
+
+    def on_preload_progress(self, preloader, progress):
+        self.progress_bar.value = progress
+
+    def load_logo_frames(self):
+        """
+        Return the frames of the logo animation in the order of display.
+
+        Each frame is described by the path of the image containing it and
+        its region in this image, None when the frame is the whole image.
+        """
+        # Use the atlas of the logo when it has been built
+        if os.path.exists(PATH_LOGO_ATLAS):
+            list_frames = []
+            atlas_dict = load_json_file(PATH_LOGO_ATLAS)
+            for page_name in atlas_dict:
+                for frame_name, region in atlas_dict[page_name].items():
+                    list_frames.append(
+                        (frame_name, PATH_ATLAS + page_name, region))
+            list_frames.sort()
+            return [(page, region) for _, page, region in list_frames]
+
         list_files = os.listdir(PATH_LOGO)
         list_files.sort(key=lambda file:
                         int(file[-7:-4].replace("k", "").replace("_", "")),
                         reverse=True)
-        list_textures = []
-        for file in list_files:
-            list_textures.append(load_texture(PATH_LOGO + file))
-        return list_textures
+        return [(PATH_LOGO + file, None) for file in list_files]
+
+    def request_page(self, page_path):
+        """
+        Start the decoding of a page of the logo in the background.
+        """
+        if page_path not in self.dict_pages:
+            self.dict_pages[page_path] = Loader.image(page_path)
+
+    def get_frame_texture(self, counter):
+        """
+        Return the texture of a frame of the logo, or None if its page is
+        not decoded yet.
+        """
+        page_path, region = self.list_frames[counter]
+        page = self.dict_pages.get(page_path)
+        if page is None or not getattr(page, "loaded", True):
+            return None
+        texture = page.texture
+        texture.mag_filter = "nearest"
+        if region is None:
+            return texture
+        return texture.get_region(*region)
 
     def update(self, *args):
-        time.sleep(0.0587)
-        if self.counter_texture < len(self.list_textures):
-            new_texture = self.list_textures[self.counter_texture]
-            self.logo_image.texture = new_texture
-            self.counter_texture += 1
-        else:
+        if self.counter_texture < len(self.list_frames):
+            # Decode in advance the pages of the next frames
+            next_counter = min(self.counter_texture + LOGO_FRAMES_AHEAD,
+                               len(self.list_frames) - 1)
+            for counter in range(self.counter_texture, next_counter + 1):
+                self.request_page(self.list_frames[counter][0])
+
+            # Follow the elapsed time so that slow frames do not slow down
+            # the animation, skipping at most one frame to catch up
+            current_time = time.perf_counter()
+            target_counter = min(
+                int((current_time - self.logo_start_time) * LOGO_FPS) + 1,
+                self.counter_texture + 2,
+                len(self.list_frames))
+            while self.counter_texture < target_counter:
+                # Wait for the frame to be decoded instead of blocking
+                new_texture = self.get_frame_texture(self.counter_texture)
+                if new_texture is None:
+                    self.logo_start_time = current_time - \
+                        self.counter_texture / LOGO_FPS
+                    return
+                self.logo_image.texture = new_texture
+
+                # Release the page once all its frames have been displayed
+                page_path = self.list_frames[self.counter_texture][0]
+                self.counter_texture += 1
+                if self.counter_texture == len(self.list_frames) or (
+                        self.list_frames[self.counter_texture][0] != page_path):
+                    del self.dict_pages[page_path]
+        elif asset_preloader.is_complete:
             Clock.unschedule(self.loading_logo)
-            self.manager.init_screen("menu")
+            asset_preloader.unbind(on_progress=self.on_preload_progress)
+            self.dict_pages = {}
+
+            # Resume the run interrupted when the application was killed
+            checkpoint = run_checkpoint.load()
+            if replay_player.is_active:
+                self.manager.init_screen("world_explorer")
+            elif checkpoint is None or profiler.is_enabled:
+                self.manager.init_screen("menu")
+            else:
+                self.manager.init_screen("world_explorer", checkpoint)
 
 
 class WindowManager(ScreenManager):
@@ -122,10 +244,128 @@ class WindowManager(ScreenManager):
         self.gray_color = background_color
         self.color_label = color_label
         self.transition = NoTransition()
+
+        # Factories of the screens not built yet
+        self.dict_screen_factories = {}
+        self.register_screen("logo", LogoScreen)
+        for screen_name, (module_name, class_name, kv_file) in \
+                DICT_SCREENS.items():
+            self.register_screen(
+                screen_name,
+                self.create_module_factory(module_name, class_name, kv_file))
+        self.list_warm_up_screens = []
+
         self.add_widget(Screen(name="opening"))
         self.current = "opening"
         self.list_former_screens = []
 
+    def register_screen(self, screen_name, factory):
+        """
+        Register the factory of a screen, called on its first display.
+
+        Parameters
+        ----------
+        screen_name : str
+            Name of the screen.
+
+        factory : callable
+            Function returning the screen, given its name as keyword.
+
+        Returns
+        -------
+        None
+        """
+        self.dict_screen_factories[screen_name] = factory
+
+    def create_module_factory(self, module_name, class_name, kv_file):
+        """
+        Create the factory of a screen whose module and kv file are only
+        loaded when it is built.
+
+        Parameters
+        ----------
+        module_name : str
+            Name of the module defining the class of the screen.
+
+        class_name : str
+            Name of the class of the screen.
+
+        kv_file : str
+            Name of the kv file of the screen in the kivy folder.
+
+        Returns
+        -------
+        callable
+            Factory of the screen.
+        """
+        def factory(**kwargs):
+            screen_class = getattr(import_module(module_name), class_name)
+            Builder.load_file(PATH_KIVY_FOLDER + kv_file, encoding="utf-8")
+            return screen_class(**kwargs)
+        return factory
+
+    def build_screen(self, screen_name):
+        """
+        Build a screen and add it to the manager if it is not built yet.
+
+        Parameters
+        ----------
+        screen_name : str
+            Name of the screen.
+
+        Returns
+        -------
+        None
+        """
+        factory = self.dict_screen_factories.pop(screen_name, None)
+        if factory is not None:
+            self.add_widget(factory(name=screen_name))
+
+    def get_screen(self, name):
+        # Build the screens when they are requested for the first time
+        self.build_screen(name)
+        return super().get_screen(name)
+
+    def warm_up_screens(self, list_screen_names):
+        """
+        Build screens in advance, one per frame, so that their first display
+        does not have to import and build them.
+
+        Parameters
+        ----------
+        list_screen_names : list
+            Names of the screens to build.
+
+        Returns
+        -------
+        None
+        """
+        self.list_warm_up_screens = [
+            screen_name for screen_name in list_screen_names
+            if screen_name in self.dict_screen_factories]
+        if self.list_warm_up_screens:
+            Clock.schedule_once(self.warm_up_next_screen)
+
+    def warm_up_next_screen(self, *args):
+        """
+        Build the next screen to warm up, if the user is still idle on the
+        menu.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        if not self.list_warm_up_screens or self.current != "menu":
+            self.list_warm_up_screens = []
+            return
+        self.build_screen(self.list_warm_up_screens.pop(0))
+        if self.list_warm_up_screens:
+            Clock.schedule_once(self.warm_up_next_screen)
+
     def init_screen(self, screen_name, *args):
         # Link the keyboard
         if not MOBILE_MODE:
@@ -133,6 +373,11 @@ class WindowManager(ScreenManager):
                 self._keyboard_closed, self, 'text')
             self._keyboard.bind(on_key_up=self.update_on_key_up)
 
+        profiler.enter_phase(screen_name + "_screen")
+
+        # Load the assets of the screen before displaying it
+        prefetch_screen(screen_name)
+
         if screen_name == "world_explorer":
             music_mixer.play("game_music", loop=True)
         if screen_name != "logo":
@@ -140,6 +385,48 @@ class WindowManager(ScreenManager):
         self.current = screen_name
         self.get_screen(self.current).init_screen(*args)
 
+        if screen_name == "menu":
+            # The start ends with the first frame of the menu
+            if profiler.is_enabled:
+                Clock.schedule_once(self.on_menu_first_frame)
+
+            # Prepare the next screens while the user is on the menu
+            self.warm_up_screens(LIST_WARM_UP_SCREENS)
+
+    def on_menu_first_frame(self, *args):
+        """
+        Record the first frame of the menu in the startup trace and start a
+        game when the trace ends with its first update.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.reach_startup_mark("menu_first_frame")
+        if profiler.is_enabled and profiler.final_mark == "world_first_update":
+            self.init_screen("world_explorer")
+
+    def reach_startup_mark(self, mark_name):
+        """
+        Record a milestone of the startup trace and stop the application
+        once the report is written, if requested.
+
+        Parameters
+        ----------
+        mark_name : str
+            Name of the milestone.
+
+        Returns
+        -------
+        None
+        """
+        if profiler.reach(mark_name) and profiler.exit_when_finished:
+            App.get_running_app().stop()
+
     def update_on_key_up(self, keyboard, keycode):
         """
         Update the the list of keys pressed when the key is up.
@@ -204,10 +491,35 @@ class MainApp(App, Widget):
             self.root_window.children[0].init_screen("logo")
         return super().on_start()
 
+    def on_pause(self):
+        # The application may be killed while paused
+        screen_manager = self.root_window.children[0]
+        if screen_manager.current == "world_explorer":
+            state = screen_manager.get_screen("world_explorer").get_run_state()
+            if state is not None:
+                run_checkpoint.save(state)
+        replay_recorder.flush()
+        persistence.flush()
+        return True
+
+    def on_resume(self):
+        # The run goes on, so it must not be resumed at the next start
+        run_checkpoint.clear()
+
+    def on_stop(self):
+        replay_recorder.flush()
+        persistence.flush(wait=True)
+
 
 # Run the application
 if __name__ == "__main__":
+    profiler.enter_phase("kv_files")
+    # The kv files of the screens are loaded with them
+    list_screens_kv = [kv_file for _, _, kv_file in DICT_SCREENS.values()]
     for file_name in os.listdir(PATH_KIVY_FOLDER):
-        if file_name.endswith(".kv"):
+        if file_name.endswith(".kv") and file_name not in list_screens_kv:
             Builder.load_file(PATH_KIVY_FOLDER + file_name, encoding="utf-8")
+    # Simulate the replay requested by the environment instead of playing
+    replay_player.start_from_environment()
+    profiler.enter_phase("app_build")
     MainApp().run()
@@ -0,0 +1,145 @@
+"""
+Module to simulate again a run recorded by the game and check that it ends
+as it did.
+
+The game records the inputs of its last run in data/last_run.replay. The
+replay is simulated as fast as possible, with the same seed, the same
+collection and the same inputs, without saving anything:
+
+    python replay_simulator.py data/last_run.replay --headless
+
+The simulation can be profiled, to study a real session offline:
+
+    python replay_simulator.py data/last_run.replay --headless \
+        --profile reports/replay.prof
+
+Functions
+---------
+simulate_replay
+    Simulate a replay in the application and return its result.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Python imports ###
+
+import argparse
+import cProfile
+import os
+import runpy
+import sys
+import time
+
+### Module imports ###
+
+from startup_profiler import HEADLESS_ENVIRONMENT
+
+
+#################
+### Constants ###
+#################
+
+
+# Same as in tools.tools_constants, which cannot be imported before Kivy is set
+REPLAY_ENVIRONMENT_VARIABLE = "LUMACRYTE_REPLAY"
+
+
+#################
+### Functions ###
+#################
+
+
+def simulate_replay(replay_path, headless=False, profile_path=None):
+    """
+    Simulate a replay in the application and return its result.
+
+    Parameters
+    ----------
+    replay_path : str
+        Path of the replay.
+    headless : bool, optional
+        Whether to run without a screen nor a sound card.
+    profile_path : str, optional
+        Path of the statistics of cProfile to write, None not to profile.
+
+    Returns
+    -------
+    dict
+        Number of steps, score, differences with the run recorded, time of
+        the simulation of the run and wall time of the application.
+    """
+    # The environment must be set before Kivy is imported
+    if headless:
+        os.environ.update(HEADLESS_ENVIRONMENT)
+    os.environ["KIVY_NO_ARGS"] = "1"
+    os.environ[REPLAY_ENVIRONMENT_VARIABLE] = os.path.abspath(replay_path)
+
+    main_folder = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(main_folder)
+    sys.path.insert(0, main_folder)
+
+    profile = cProfile.Profile() if profile_path is not None else None
+    start_time = time.perf_counter()
+    if profile is not None:
+        profile.enable()
+    runpy.run_path("main.py", run_name="__main__")
+    if profile is not None:
+        profile.disable()
+        folder = os.path.dirname(profile_path)
+        if folder != "":
+            os.makedirs(folder, exist_ok=True)
+        profile.dump_stats(profile_path)
+    wall_time = time.perf_counter() - start_time
+
+    from tools.tools_replay import replay_player
+    if replay_player.result is None:
+        return None
+    result = dict(replay_player.result)
+    result["wall_time"] = wall_time
+    return result
+
+
+def main(list_arguments=None):
+    """
+    Command line interface to simulate a replay.
+
+    Returns
+    -------
+    int
+        Exit code, 1 when the simulation differs from the run recorded.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("replay")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--profile", default=None)
+    arguments = parser.parse_args(list_arguments)
+
+    result = simulate_replay(
+        arguments.replay, headless=arguments.headless,
+        profile_path=arguments.profile)
+    if result is None:
+        print("The application stopped before the end of the replay")
+        return 1
+
+    print(f"Simulated {result['steps']} steps in "
+          f"{result['simulation_time']:.3f} s, score {result['score']} "
+          f"(application run for {result['wall_time']:.3f} s)")
+    for difference in result["differences"]:
+        print("DIFFERENT " + difference)
+    if result["differences"]:
+        return 1
+    print("The simulation matches the run recorded")
+    return 0
+
+
+###############
+### Process ###
+###############
+
+
+if __name__ == "__main__":
+    sys.exit(main())
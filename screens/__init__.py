@@ -1,4 +1,6 @@
-from screens.menu import MenuScreen
-from screens.settings import SettingsScreen
-from screens.game_over import GameOverScreen
-from screens.collection import CollectionScreen
\ No newline at end of file
+"""
+Package of the screens of the application.
+
+The screens are not imported here: the window manager imports each of them
+the first time it is displayed.
+"""
@@ -16,12 +16,14 @@ from kivy.properties import StringProperty, ObjectProperty, NumericProperty
 from tools.tools_constants import (
     PATH_TITLE_FONT,
     DICT_TREASURE_STONES,
-    my_collection,
     PATH_IMAGES,
     Window
 )
-from tools.tools_world_explorer import (
-    load_textures_from_atlas
+from tools.tools_settings import (
+    my_collection
+)
+from tools.tools_assets import (
+    TEXTURE_DICT
 )
 
 
@@ -75,7 +77,6 @@ class CollectionScreen(Screen):
         self.build_scroll_view()
 
     def build_scroll_view(self):
-        TEXTURE_DICT = load_textures_from_atlas("map_textures")
         image_dimension = (Window.size[0] - 2 * self.padding[0] - self.spacing * (
             self.number_cols - 1)) / self.number_cols
         height_layout = image_dimension + self.label_height
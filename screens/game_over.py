@@ -14,6 +14,7 @@ from tools.tools_constants import (
 )
 from kivy.properties import StringProperty, ObjectProperty, NumericProperty
 from tools.tools_sound import music_mixer
+from tools.tools_run_stats import run_stats
 
 
 class GameOverScreen(Screen):
@@ -35,8 +36,22 @@ class GameOverScreen(Screen):
         music_mixer.play("game_over_music", loop=True)
         score_str = f"Score: {int(args[0])}"
         self.ids.score_label.text = score_str
+        self.ids.stats_label.text = self.get_stats_str()
         Clock.schedule_interval(self.update, 1 / FPS)
 
+    def get_stats_str(self):
+        """
+        Return the summary of the runs of the player, with the score of the
+        run before this one.
+        """
+        dict_summary = run_stats.get_summary()
+        stats_str = f"Runs: {dict_summary['number_runs']}\n" + \
+            f"Mean score: {int(dict_summary['score']['mean'])}"
+        list_last_runs = run_stats.get_last_runs(2)
+        if len(list_last_runs) == 2:
+            stats_str += f"\nPrevious score: {list_last_runs[1]['score']}"
+        return stats_str
+
     def update(self, *args):
         self.ids.back_to_menu.opacity += self.opacity_state * OPACITY_RATE
         if self.ids.back_to_menu.opacity < 0 or self.ids.back_to_menu.opacity > 1:
@@ -18,9 +18,9 @@ from tools.tools_constants import (
     OPACITY_RATE,
     PATH_TITLE_FONT,
     MOBILE_MODE,
-    my_collection,
     Window
 )
+from tools.tools_settings import my_collection
 from tools.tools_sound import music_mixer
 
 
@@ -45,7 +45,7 @@ class MenuScreen(Screen):
         self.width_back_image = Window.size[0]
         self.height_back_image = Window.size[0] * 392 / 632
         self.high_score = "High score: " + str(my_collection.high_score)
-        if music_mixer.musics["title_music"].state != "play":
+        if not music_mixer.is_playing("title_music"):
             music_mixer.play("title_music", loop=True)
 
         try:
@@ -7,16 +7,13 @@ from kivy.uix.screenmanager import Screen
 from kivy.properties import StringProperty, ObjectProperty, NumericProperty
 from tools.tools_constants import (
     PATH_TITLE_FONT,
-    DICT_KEYS,
     INTERACT,
-    PATH_SETTINGS,
-    SETTINGS,
     PATH_IMAGES,
-    my_collection,
     Window
 )
-from tools.tools_basis import (
-    save_json_file
+from tools.tools_settings import (
+    settings,
+    my_collection
 )
 
 
@@ -42,11 +39,11 @@ class SettingsScreen(Screen):
         self.width_back_image = Window.size[0]
         self.height_back_image = Window.size[0] * 392 / 632
         self.high_score = "High score: " + str(my_collection.high_score)
-        self.top_key = DICT_KEYS["top"]
-        self.left_key = DICT_KEYS["left"]
-        self.bottom_key = DICT_KEYS["bottom"]
-        self.right_key = DICT_KEYS["right"]
-        self.interact_key = DICT_KEYS[INTERACT]
+        self.top_key = settings.keys["top"]
+        self.left_key = settings.keys["left"]
+        self.bottom_key = settings.keys["bottom"]
+        self.right_key = settings.keys["right"]
+        self.interact_key = settings.keys[INTERACT]
         self._keyboard = Window.request_keyboard(
             self._keyboard_closed, self, 'text')
         self._keyboard.bind(on_key_up=self.update_on_key_up)
@@ -65,7 +62,7 @@ class SettingsScreen(Screen):
                 self.current_button = dict_buttons[key][0]
                 dict_buttons[key][1].text = "Press new key"
             else:
-                dict_buttons[key][1].text = DICT_KEYS[key]
+                dict_buttons[key][1].text = settings.keys[key]
 
     def update_on_key_up(self, keyboard, keycode):
         """
@@ -82,7 +79,6 @@ class SettingsScreen(Screen):
         -------
         None
         """
-        global DICT_KEYS, SETTINGS
         dict_widgets = {
             self.ids.top_button: [self.ids.top_key_input, "top"],
             self.ids.left_button: [self.ids.left_key_input, "left"],
@@ -92,9 +88,8 @@ class SettingsScreen(Screen):
         }
         if self.current_button is not None:
             dict_widgets[self.current_button][0].text = keycode[1]
-            DICT_KEYS[dict_widgets[self.current_button][1]] = keycode[1]
-            SETTINGS["keys"] = DICT_KEYS
-            save_json_file(PATH_SETTINGS, SETTINGS)
+            settings.set(
+                "keys", dict_widgets[self.current_button][1], keycode[1])
             self.current_button = None
 
     def _keyboard_closed(self):
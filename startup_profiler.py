@@ -0,0 +1,509 @@
+"""
+Module to trace the start of the application and check it against a budget.
+
+The trace is recorded by the profiler of tools.tools_profiler, and enabled by setting the environment variable
+LUMACRYTE_STARTUP_TRACE to the path of the report to write, or to 1 to use
+the default path. The report is a JSON file listing the phases of the start
+with their wall time and memory, the milestones reached and the time spent
+in each module import. It can be checked and compared from the command
+line:
+
+    python startup_profiler.py run --headless
+    python startup_profiler.py check reports/startup_report.json
+    python startup_profiler.py compare old_report.json new_report.json
+
+The cold start can also be benchmarked over several runs, until the menu or
+until the first update of the game, to report percentiles of the milestones:
+
+    python startup_profiler.py benchmark --headless --runs 10 \
+        --final-mark world_first_update
+
+Functions
+---------
+check_budgets
+    Return the list of the budgets exceeded by a report.
+
+compare_reports
+    Return the differences of timing between two reports.
+
+run_benchmark
+    Start the application several times and summarize the timings.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Python imports ###
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+### Module imports ###
+
+from tools.tools_profiler import (
+    TRACE_ENVIRONMENT_VARIABLE,
+    EXIT_ENVIRONMENT_VARIABLE,
+    MEMORY_ENVIRONMENT_VARIABLE,
+    FINAL_MARK_ENVIRONMENT_VARIABLE,
+    DEFAULT_REPORT_PATH,
+    LIST_MARKS,
+    DEFAULT_FINAL_MARK
+)
+
+
+#################
+### Constants ###
+#################
+
+
+DEFAULT_BENCHMARK_PATH = "reports/startup_benchmark.json"
+
+# Percentiles reported by the benchmark
+LIST_PERCENTILES = [50, 90, 95]
+
+# Environment used to start the application without a screen nor a sound card
+HEADLESS_ENVIRONMENT = {
+    "KIVY_NO_ARGS": "1",
+    "KIVY_NO_FILELOG": "1",
+    "SDL_VIDEODRIVER": "offscreen",
+    "SDL_AUDIODRIVER": "dummy"
+}
+
+# Maximal values allowed in a report, in seconds and megabytes
+DEFAULT_BUDGETS = {
+    "phases": {
+        "imports": 3.0,
+        "kv_files": 1.0,
+        "app_build": 1.0,
+        "logo_screen": 1.0,
+        "menu_screen": 1.0
+    },
+    "marks": {
+        "logo_first_frame": 6.0,
+        "menu_first_frame": 16.0,
+        "world_first_update": 18.0
+    },
+    "import_time": 3.0,
+    "memory_peak": 150.0
+}
+
+NUMBER_IMPORTS_DISPLAYED = 15
+
+
+#################
+### Functions ###
+#################
+
+
+def check_budgets(report, budgets=DEFAULT_BUDGETS):
+    """
+    Return the list of the budgets exceeded by a report.
+
+    Parameters
+    ----------
+    report : dict
+        Report written by the profiler.
+    budgets : dict, optional
+        Maximal values allowed for the phases, the milestones, the total
+        time of the imports and the peak of memory.
+
+    Returns
+    -------
+    list
+        Messages describing the budgets exceeded, empty when all are met.
+    """
+    list_failures = []
+    dict_phases = {}
+    for phase in report["phases"]:
+        dict_phases[phase["name"]] = dict_phases.get(
+            phase["name"], 0.) + phase["duration"]
+
+    for name, budget in budgets.get("phases", {}).items():
+        if name in dict_phases and dict_phases[name] > budget:
+            list_failures.append(
+                f"phase {name}: {dict_phases[name]:.3f} s > {budget} s")
+    # The milestones after the final one are not expected in the report
+    final_mark = report.get("final_mark", DEFAULT_FINAL_MARK)
+    list_expected_marks = LIST_MARKS[:LIST_MARKS.index(final_mark) + 1]
+    for name, budget in budgets.get("marks", {}).items():
+        if name not in report["marks"]:
+            if name in list_expected_marks:
+                list_failures.append(f"mark {name}: never reached")
+        elif report["marks"][name] > budget:
+            list_failures.append(
+                f"mark {name}: {report['marks'][name]:.3f} s > {budget} s")
+    if "import_time" in budgets and \
+            report["import_time"] > budgets["import_time"]:
+        list_failures.append(
+            f"import time: {report['import_time']:.3f} s > "
+            f"{budgets['import_time']} s")
+    if "memory_peak" in budgets and report["memory_traced"] and \
+            report["memory_peak"] > budgets["memory_peak"]:
+        list_failures.append(
+            f"memory peak: {report['memory_peak']:.1f} MB > "
+            f"{budgets['memory_peak']} MB")
+    return list_failures
+
+
+def compare_reports(old_report, new_report):
+    """
+    Return the differences of timing between two reports.
+
+    Parameters
+    ----------
+    old_report : dict
+        Report of reference.
+    new_report : dict
+        Report to compare to the reference.
+
+    Returns
+    -------
+    list
+        Lines describing the differences for the phases, the milestones
+        and the slowest imports.
+    """
+    list_lines = []
+
+    def add_line(name, old_value, new_value):
+        old_str = "-" if old_value is None else f"{old_value:.3f}"
+        new_str = "-" if new_value is None else f"{new_value:.3f}"
+        delta_str = ""
+        if old_value is not None and new_value is not None:
+            delta_str = f"{new_value - old_value:+.3f}"
+        list_lines.append(f"{name:40} {old_str:>9} {new_str:>9} {delta_str:>9}")
+
+    old_phases = {phase["name"]: phase["duration"]
+                  for phase in old_report["phases"]}
+    new_phases = {phase["name"]: phase["duration"]
+                  for phase in new_report["phases"]}
+    for name in dict.fromkeys(list(old_phases) + list(new_phases)):
+        add_line("phase " + name, old_phases.get(name), new_phases.get(name))
+
+    for name in dict.fromkeys(
+            list(old_report["marks"]) + list(new_report["marks"])):
+        add_line("mark " + name, old_report["marks"].get(name),
+                 new_report["marks"].get(name))
+
+    add_line("import time", old_report["import_time"],
+             new_report["import_time"])
+
+    old_imports = {record["module"]: record["self"]
+                   for record in old_report["imports"]}
+    new_imports = {record["module"]: record["self"]
+                   for record in new_report["imports"]}
+    list_slowest = [record["module"] for record in
+                    new_report["imports"][:NUMBER_IMPORTS_DISPLAYED]]
+    for name in list_slowest:
+        add_line("import " + name, old_imports.get(name), new_imports[name])
+
+    return list_lines
+
+
+def print_report(report):
+    """
+    Print a summary of a report.
+    """
+    print(f"Total: {report['total_time']:.3f} s, "
+          f"imports: {report['import_time']:.3f} s, "
+          f"memory peak: {report['memory_peak']:.1f} MB")
+    for phase in report["phases"]:
+        print(f"  phase {phase['name']:30} {phase['duration']:8.3f} s "
+              f"{phase['memory']:+8.1f} MB")
+    for name, mark_time in report["marks"].items():
+        print(f"  mark {name:31} {mark_time:8.3f} s")
+    for record in report["imports"][:NUMBER_IMPORTS_DISPLAYED]:
+        print(f"  import {record['module']:29} {record['self']:8.3f} s")
+
+
+def run_application(report_path, headless=False, trace_memory=True,
+                    final_mark=DEFAULT_FINAL_MARK, timeout=120):
+    """
+    Start the application with the trace enabled until the final milestone
+    is reached and return its report.
+    """
+    environment = dict(os.environ)
+    if headless:
+        environment.update(HEADLESS_ENVIRONMENT)
+    environment[TRACE_ENVIRONMENT_VARIABLE] = report_path
+    environment[EXIT_ENVIRONMENT_VARIABLE] = "1"
+    environment[MEMORY_ENVIRONMENT_VARIABLE] = "1" if trace_memory else "0"
+    environment[FINAL_MARK_ENVIRONMENT_VARIABLE] = final_mark
+    if os.path.exists(report_path):
+        os.remove(report_path)
+
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "main.py")
+    subprocess.run([sys.executable, main_path], env=environment,
+                   cwd=os.path.dirname(main_path), timeout=timeout,
+                   check=False)
+    if not os.path.exists(report_path):
+        return None
+    with open(report_path, "r", encoding="UTF-8") as file:
+        return json.load(file)
+
+
+def compute_percentile(list_values, percentile):
+    """
+    Return a percentile of a list of values, interpolated linearly between
+    the two closest ranks.
+
+    Parameters
+    ----------
+    list_values : list
+        Values, not necessarily sorted.
+    percentile : float
+        Percentile between 0 and 100.
+
+    Returns
+    -------
+    float
+        Value of the percentile.
+    """
+    list_sorted = sorted(list_values)
+    rank = (len(list_sorted) - 1) * percentile / 100
+    lower_rank = int(rank)
+    upper_rank = min(lower_rank + 1, len(list_sorted) - 1)
+    return list_sorted[lower_rank] + (rank - lower_rank) * (
+        list_sorted[upper_rank] - list_sorted[lower_rank])
+
+
+def summarize_timings(dict_timings):
+    """
+    Return the minimum, the maximum and the percentiles of lists of timings.
+
+    Parameters
+    ----------
+    dict_timings : dict
+        Dictionary associating a name to the list of its timings.
+
+    Returns
+    -------
+    dict
+        Dictionary associating each name to its statistics.
+    """
+    dict_summary = {}
+    for name, list_values in dict_timings.items():
+        dict_summary[name] = {
+            "runs": len(list_values),
+            "min": min(list_values),
+            "max": max(list_values),
+            **{f"p{percentile}": compute_percentile(list_values, percentile)
+               for percentile in LIST_PERCENTILES}
+        }
+    return dict_summary
+
+
+def run_benchmark(number_runs, headless=False, final_mark=DEFAULT_FINAL_MARK,
+                  timeout=120):
+    """
+    Start the application several times from a cold process and summarize
+    the timings of its milestones and phases.
+
+    The memory is not traced, so that the timings are not slowed down.
+
+    Parameters
+    ----------
+    number_runs : int
+        Number of starts of the application.
+    headless : bool, optional
+        Whether to start the application without a screen nor a sound card.
+    final_mark : str, optional
+        Milestone ending each run, among LIST_MARKS.
+    timeout : float, optional
+        Maximal duration of a run, in seconds.
+
+    Returns
+    -------
+    dict
+        Benchmark with the number of runs, the number of failed runs and
+        the statistics of each milestone and phase.
+    """
+    dict_marks = {}
+    dict_phases = {}
+    number_failures = 0
+    with tempfile.TemporaryDirectory() as folder:
+        report_path = os.path.join(folder, "startup_report.json")
+        for _ in range(number_runs):
+            try:
+                report = run_application(
+                    report_path, headless=headless, trace_memory=False,
+                    final_mark=final_mark, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                report = None
+            if report is None or final_mark not in report["marks"]:
+                number_failures += 1
+                continue
+            for name, mark_time in report["marks"].items():
+                dict_marks.setdefault(name, []).append(mark_time)
+            for phase in report["phases"]:
+                dict_phases.setdefault(phase["name"], []).append(
+                    phase["duration"])
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "final_mark": final_mark,
+        "runs": number_runs,
+        "failures": number_failures,
+        "marks": summarize_timings(dict_marks),
+        "phases": summarize_timings(dict_phases)
+    }
+
+
+def check_benchmark(benchmark, budgets=DEFAULT_BUDGETS):
+    """
+    Return the list of the budgets exceeded by the median of a benchmark.
+
+    Parameters
+    ----------
+    benchmark : dict
+        Benchmark returned by run_benchmark.
+    budgets : dict, optional
+        Maximal values allowed for the phases and the milestones.
+
+    Returns
+    -------
+    list
+        Messages describing the budgets exceeded, empty when all are met.
+    """
+    list_failures = []
+    if benchmark["failures"] > 0:
+        list_failures.append(
+            f"{benchmark['failures']} runs out of {benchmark['runs']} "
+            f"did not reach {benchmark['final_mark']}")
+    for category in ("phases", "marks"):
+        for name, budget in budgets.get(category, {}).items():
+            if name in benchmark[category] and \
+                    benchmark[category][name]["p50"] > budget:
+                list_failures.append(
+                    f"median of {category[:-1]} {name}: "
+                    f"{benchmark[category][name]['p50']:.3f} s > {budget} s")
+    return list_failures
+
+
+def print_benchmark(benchmark):
+    """
+    Print the statistics of a benchmark.
+    """
+    print(f"Runs: {benchmark['runs']}, failures: {benchmark['failures']}")
+    header = "".join(f"{'p' + str(percentile):>9}"
+                     for percentile in LIST_PERCENTILES)
+    print(f"  {'':37}{'min':>9}{header}{'max':>9}")
+    for category in ("marks", "phases"):
+        for name, statistics in benchmark[category].items():
+            values = "".join(
+                f"{statistics['p' + str(percentile)]:9.3f}"
+                for percentile in LIST_PERCENTILES)
+            print(f"  {category[:-1] + ' ' + name:37}"
+                  f"{statistics['min']:9.3f}{values}{statistics['max']:9.3f}")
+
+
+def load_report(path):
+    with open(path, "r", encoding="UTF-8") as file:
+        return json.load(file)
+
+
+def main(list_arguments=None):
+    """
+    Command line interface to run, check and compare the reports.
+
+    Returns
+    -------
+    int
+        Exit code, 1 when a budget is exceeded.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser(
+        "run", help="start the application and check its report")
+    run_parser.add_argument("--report", default=DEFAULT_REPORT_PATH)
+    run_parser.add_argument("--budgets", default=None)
+    run_parser.add_argument("--headless", action="store_true")
+    run_parser.add_argument("--no-memory", action="store_true")
+    run_parser.add_argument("--final-mark", default=DEFAULT_FINAL_MARK,
+                            choices=LIST_MARKS)
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark", help="start the application several times and "
+        "report the percentiles of its timings")
+    benchmark_parser.add_argument("--runs", type=int, default=10)
+    benchmark_parser.add_argument("--report", default=DEFAULT_BENCHMARK_PATH)
+    benchmark_parser.add_argument("--budgets", default=None)
+    benchmark_parser.add_argument("--headless", action="store_true")
+    benchmark_parser.add_argument("--final-mark", default="world_first_update",
+                                  choices=LIST_MARKS)
+
+    check_parser = subparsers.add_parser(
+        "check", help="check a report against the budgets")
+    check_parser.add_argument("report")
+    check_parser.add_argument("--budgets", default=None)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="compare two reports")
+    compare_parser.add_argument("old_report")
+    compare_parser.add_argument("new_report")
+
+    arguments = parser.parse_args(list_arguments)
+
+    if arguments.command == "compare":
+        for line in compare_reports(load_report(arguments.old_report),
+                                    load_report(arguments.new_report)):
+            print(line)
+        return 0
+
+    budgets = DEFAULT_BUDGETS
+    if arguments.command != "compare" and arguments.budgets is not None:
+        budgets = load_report(arguments.budgets)
+
+    if arguments.command == "benchmark":
+        benchmark = run_benchmark(
+            arguments.runs, headless=arguments.headless,
+            final_mark=arguments.final_mark)
+        folder = os.path.dirname(arguments.report)
+        if folder != "":
+            os.makedirs(folder, exist_ok=True)
+        with open(arguments.report, "w", encoding="UTF-8") as file:
+            json.dump(benchmark, file, indent=4)
+        print_benchmark(benchmark)
+        list_failures = check_benchmark(benchmark, budgets)
+        for failure in list_failures:
+            print("FAILED " + failure)
+        return 1 if list_failures else 0
+
+    if arguments.command == "run":
+        report = run_application(
+            arguments.report, headless=arguments.headless,
+            trace_memory=not arguments.no_memory,
+            final_mark=arguments.final_mark)
+        if report is None:
+            print("The application stopped before writing its report")
+            return 1
+    else:
+        report = load_report(arguments.report)
+
+    print_report(report)
+    list_failures = check_budgets(report, budgets)
+    for failure in list_failures:
+        print("FAILED " + failure)
+    if list_failures:
+        return 1
+    print("All the budgets are met")
+    return 0
+
+
+###############
+### Process ###
+###############
+
+
+if __name__ == "__main__":
+    sys.exit(main())
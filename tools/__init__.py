@@ -6,15 +6,30 @@ Modules
 tools_basis
     Module containing basis functions.
 
+tools_checkpoint
+    Module to save the state of the current run, to resume it after the
+    application has been killed while paused.
+
 tools_constants
     Module referencing the main constants of the application.
 
 tools_kivy
     Module for general Kivy widgets and functions.
 
+tools_persistence
+    Module to save the json files of the application without blocking the
+    frames of the game.
+
+tools_profiler
+    Module to record the start of the application: its phases, its
+    milestones and the time spent in each module import.
+
+tools_replay
+    Module to record the runs of the player and to simulate them again.
+
+tools_run_stats
+    Module to store the statistics of each run of the player.
+
 tools_settings
     Module dealing with the settings of the application.
 """
-
-from tools.tools_basis import *
-from tools.tools_constants import *
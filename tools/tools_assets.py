@@ -0,0 +1,493 @@
+"""
+Module to load the textures and the sounds of the game when they are needed.
+
+The loading of an asset is divided into two steps: the decoding of its file,
+which can be done on a worker thread, and its finalization, which creates
+the OpenGL textures and must be done on the main thread.
+
+Classes
+-------
+AssetRegistry
+    Dictionary-like container loading each asset on its first use.
+AssetPreloader
+    Service decoding assets in the background and finalizing them in small
+    slices on each frame.
+
+Functions
+---------
+prefetch_screen
+    Load in advance the assets needed by a screen.
+
+Variables
+---------
+ATLAS_DICT : AssetRegistry
+    Textures of each atlas of the game, referenced by the name of the atlas.
+TEXTURE_DICT : AssetRegistry
+    Textures of the map and of the character, referenced by their name.
+MUSIC_DICT : AssetRegistry
+    Musics of the game, streamed from their file, referenced by the name
+    of their file.
+SOUND_DICT : AssetRegistry
+    Sound effects of the game, referenced by the name of their file.
+asset_preloader : AssetPreloader
+    Single instance of the preloader, started by the logo screen.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Python imports ###
+
+import os
+import time
+import queue
+import threading
+
+from functools import partial
+
+### Kivy imports ###
+
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.core.image import Image as CoreImage, ImageLoader
+from kivy.core.audio import SoundLoader
+try:
+    from kivy.core.audio.audio_sdl2 import MusicSDL2
+except ImportError:
+    MusicSDL2 = None
+
+### Module imports ###
+
+from tools.tools_constants import (
+    PATH_ATLAS,
+    PATH_IMAGES,
+    PATH_SOUNDS,
+    PATH_SOUNDS_PCM,
+    PATH_MUSICS,
+    SOUND_VOLUME,
+    MUSIC_VOLUME,
+    DICT_SCREEN_ASSETS,
+    PRELOAD_FRAME_BUDGET,
+    LIST_MIPMAPPED_ATLASES
+)
+from tools.tools_basis import (
+    load_json_file
+)
+
+
+###############
+### Classes ###
+###############
+
+
+class AssetRegistry():
+    """
+    Dictionary-like container loading each asset on its first use.
+
+    Only the names of the assets and the way to find them are known at
+    creation, so creating a registry does not read any image or sound.
+    """
+
+    def __init__(self, dict_sources, decoder, finalizer):
+        """
+        Create the registry.
+
+        Parameters
+        ----------
+        dict_sources : dict
+            Dictionary containing the source of each asset, referenced by
+            its name.
+        decoder : callable
+            Function taking the name and the source of an asset and
+            returning its decoded data. It must not use OpenGL, so that it
+            can be called from a worker thread.
+        finalizer : callable
+            Function taking the name, the source and the decoded data of an
+            asset and returning the asset, called on the main thread.
+
+        Returns
+        -------
+        None
+        """
+        self.dict_sources = dict_sources
+        self.decoder = decoder
+        self.finalizer = finalizer
+        self.dict_assets = {}
+
+    def __getitem__(self, name):
+        if name not in self.dict_assets:
+            self.finalize(name, self.decode(name))
+        return self.dict_assets[name]
+
+    def __contains__(self, name):
+        return name in self.dict_sources
+
+    def __iter__(self):
+        return iter(self.dict_sources)
+
+    def __len__(self):
+        return len(self.dict_sources)
+
+    def decode(self, name):
+        """
+        Return the decoded data of an asset, safe to call from a thread.
+        """
+        return self.decoder(name, self.dict_sources[name])
+
+    def finalize(self, name, data):
+        """
+        Create an asset from its decoded data, unless it is already loaded.
+        """
+        if name not in self.dict_assets:
+            self.dict_assets[name] = self.finalizer(
+                name, self.dict_sources[name], data)
+        return self.dict_assets[name]
+
+    def load_copy(self, name):
+        """
+        Load a new instance of an asset, which is not kept by the registry.
+        It does not change the registry, so it can be called from a thread.
+        """
+        return self.finalizer(
+            name, self.dict_sources[name], self.decode(name))
+
+    def is_loaded(self, name):
+        """
+        Tell if the asset has already been loaded.
+        """
+        return name in self.dict_assets
+
+    def loaded_items(self):
+        """
+        Return the list of the assets already loaded with their name.
+        """
+        return list(self.dict_assets.items())
+
+    def prefetch(self, list_names=None):
+        """
+        Load in advance a list of assets.
+
+        Parameters
+        ----------
+        list_names : list, optional
+            Names of the assets to load, all the assets when None.
+
+        Returns
+        -------
+        None
+        """
+        if list_names is None:
+            list_names = self.dict_sources
+        for name in list_names:
+            self[name]
+
+    def unload(self, name):
+        """
+        Forget a loaded asset, it will be loaded again on its next use.
+        """
+        self.dict_assets.pop(name, None)
+
+
+class AssetPreloader(EventDispatcher):
+    """
+    Service decoding assets in the background and finalizing them in small
+    slices on each frame.
+
+    A single worker thread decodes the assets in order, so that an atlas is
+    always finalized before the textures it contains.
+    """
+
+    __events__ = ("on_progress", "on_complete")
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.list_tasks = []
+        self.decoded_queue = queue.SimpleQueue()
+        self.number_tasks_done = 0
+        self.is_started = False
+        self.is_complete = False
+        self.upload_event = None
+
+    @property
+    def progress(self):
+        """
+        Ratio of the assets already loaded, between 0 and 1.
+        """
+        if not self.list_tasks:
+            return 1.
+        return self.number_tasks_done / len(self.list_tasks)
+
+    def start(self, list_screens):
+        """
+        Start loading the assets of several screens in the background.
+
+        Parameters
+        ----------
+        list_screens : list
+            Names of the screens, in the order their assets are needed.
+
+        Returns
+        -------
+        None
+        """
+        if self.is_started:
+            return
+        self.is_started = True
+        self.list_tasks = self.list_screen_tasks(list_screens)
+        if not self.list_tasks:
+            self.complete()
+            return
+
+        threading.Thread(
+            target=self.decode_assets,
+            args=(list(self.list_tasks),),
+            daemon=True).start()
+        self.upload_event = Clock.schedule_interval(self.upload_assets, 0)
+
+    def list_screen_tasks(self, list_screens):
+        """
+        Return the assets of the screens not loaded yet, as couples of
+        registry and name, without duplicates.
+        """
+        list_tasks = []
+        for screen_name in list_screens:
+            dict_assets = DICT_SCREEN_ASSETS.get(screen_name, {})
+            for registry_name, list_names in dict_assets.items():
+                registry = DICT_REGISTRIES[registry_name]
+                if list_names is None:
+                    list_names = list(registry)
+                for name in list_names:
+                    # Decode the atlas of a texture before the texture itself
+                    source = registry.dict_sources[name]
+                    if registry is TEXTURE_DICT and source in ATLAS_DICT:
+                        list_tasks.append((ATLAS_DICT, source))
+                    list_tasks.append((registry, name))
+        return [task for task in dict.fromkeys(list_tasks)
+                if not task[0].is_loaded(task[1])]
+
+    def decode_assets(self, list_tasks):
+        """
+        Decode the assets on the worker thread.
+        """
+        for registry, name in list_tasks:
+            try:
+                data = registry.decode(name)
+            except Exception as error:
+                data = error
+            self.decoded_queue.put((registry, name, data))
+
+    def upload_assets(self, *args):
+        """
+        Finalize the decoded assets on the main thread, within the budget of
+        time of a frame.
+        """
+        start_time = time.perf_counter()
+        while time.perf_counter() - start_time < PRELOAD_FRAME_BUDGET:
+            try:
+                registry, name, data = self.decoded_queue.get_nowait()
+            except queue.Empty:
+                break
+            # The asset will be loaded again on its first use
+            if isinstance(data, Exception):
+                print("Unable to preload", name, data)
+            else:
+                registry.finalize(name, data)
+            self.number_tasks_done += 1
+            self.dispatch("on_progress", self.progress)
+            if self.number_tasks_done == len(self.list_tasks):
+                self.complete()
+                break
+
+    def complete(self):
+        if self.upload_event is not None:
+            self.upload_event.cancel()
+        self.is_complete = True
+        self.dispatch("on_complete")
+
+    def on_progress(self, progress):
+        pass
+
+    def on_complete(self):
+        pass
+
+
+#################
+### Functions ###
+#################
+
+
+def decode_image(image_file, mipmap=False):
+    """
+    Decode an image without creating its texture.
+    """
+    return ImageLoader.load(image_file, keep_data=True, mipmap=mipmap)
+
+
+def finalize_image(image):
+    """
+    Create the texture of a decoded image, with the filter for pixel art.
+    """
+    texture = CoreImage(image).texture
+    texture.mag_filter = "nearest"
+    if texture.mipmap:
+        texture.min_filter = "linear_mipmap_linear"
+    return texture
+
+
+def decode_atlas(atlas_name, path_atlas):
+    """
+    Decode the pages of an atlas and return them with their regions.
+    """
+    list_pages = []
+    folder = os.path.dirname(path_atlas)
+    atlas_dict = load_json_file(path_atlas)
+    mipmap = atlas_name in LIST_MIPMAPPED_ATLASES
+    for page_name, dict_regions in atlas_dict.items():
+        list_pages.append((
+            decode_image(os.path.join(folder, page_name), mipmap=mipmap),
+            dict_regions))
+    return list_pages
+
+
+def finalize_atlas(atlas_name, path_atlas, list_pages):
+    """
+    Return the textures of an atlas, referenced by their name.
+    """
+    dict_textures = {}
+    for image, dict_regions in list_pages:
+        page_texture = finalize_image(image)
+        for texture_name, region in dict_regions.items():
+            dict_textures[texture_name] = page_texture.get_region(*region)
+    return dict_textures
+
+
+def decode_texture(name, source):
+    """
+    Decode a texture, the textures of an atlas are decoded with their atlas.
+    """
+    if source in ATLAS_DICT:
+        return None
+    return decode_image(source)
+
+
+def finalize_texture(name, source, image):
+    """
+    Return a texture, either from its atlas or from its own image.
+    """
+    if source in ATLAS_DICT:
+        return ATLAS_DICT[source][name]
+    return finalize_image(image)
+
+
+def decode_sound(name, source):
+    """
+    Load a sound, raising an error when no audio provider can decode it.
+    """
+    sound = SoundLoader.load(source)
+    if sound is None:
+        raise ValueError(source + " cannot be decoded")
+    return sound
+
+
+def decode_music(name, source):
+    """
+    Open a music to stream it from its file, or load it entirely when the
+    audio provider cannot stream.
+    """
+    if MusicSDL2 is None:
+        return decode_sound(name, source)
+    music = MusicSDL2(source=source)
+    music.load()
+    return music
+
+
+def finalize_sound(name, source, sound, volume):
+    """
+    Set the volume of a sound once loaded.
+    """
+    if sound is not None:
+        sound.volume = volume
+    return sound
+
+
+def index_atlas(atlas_name):
+    """
+    Return the name of the atlas of each texture it contains, without
+    loading its pages.
+    """
+    dict_index = {}
+    atlas_dict = load_json_file(PATH_ATLAS + atlas_name + ".atlas")
+    for page_name in atlas_dict:
+        for texture_name in atlas_dict[page_name]:
+            dict_index[texture_name] = atlas_name
+    return dict_index
+
+
+def index_sounds(folder):
+    """
+    Return the path of each sound of a folder, referenced by its name.
+    """
+    dict_index = {}
+    if not os.path.isdir(folder):
+        return dict_index
+    for file in os.listdir(folder):
+        name_file = file.split(".")[0]
+        dict_index[name_file] = folder + file
+    return dict_index
+
+
+def prefetch_screen(screen_name):
+    """
+    Load the assets needed by a screen before it is displayed.
+
+    Parameters
+    ----------
+    screen_name : str
+        Name of the screen, key of DICT_SCREEN_ASSETS.
+
+    Returns
+    -------
+    None
+    """
+    dict_assets = DICT_SCREEN_ASSETS.get(screen_name, {})
+    for registry_name, list_names in dict_assets.items():
+        DICT_REGISTRIES[registry_name].prefetch(list_names)
+
+
+###############
+### Process ###
+###############
+
+
+# Index the assets without loading them
+ATLAS_DICT = AssetRegistry(
+    {atlas_name: PATH_ATLAS + atlas_name + ".atlas"
+     for atlas_name in ("map_textures", "ghost_textures")},
+    decode_atlas, finalize_atlas)
+
+dict_texture_sources = index_atlas("map_textures")
+dict_texture_sources["blank"] = PATH_IMAGES + "blank.png"
+dict_texture_sources.update(index_atlas("ghost_textures"))
+TEXTURE_DICT = AssetRegistry(
+    dict_texture_sources, decode_texture, finalize_texture)
+
+MUSIC_DICT = AssetRegistry(
+    index_sounds(PATH_MUSICS), decode_music,
+    partial(finalize_sound, volume=MUSIC_VOLUME))
+# Use the PCM version of the short sounds, which does not need decoding
+dict_sound_sources = index_sounds(PATH_SOUNDS)
+dict_sound_sources.update(index_sounds(PATH_SOUNDS_PCM))
+SOUND_DICT = AssetRegistry(
+    dict_sound_sources, decode_sound,
+    partial(finalize_sound, volume=SOUND_VOLUME))
+
+DICT_REGISTRIES = {
+    "textures": TEXTURE_DICT,
+    "musics": MUSIC_DICT,
+    "sounds": SOUND_DICT
+}
+
+asset_preloader = AssetPreloader()
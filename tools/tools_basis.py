@@ -8,6 +8,10 @@ load_json_file
 
 save_json_file
     Save the content of the given dictionnary inside the specified json file.
+
+write_file_atomically
+    Write a text file through a temporary file, so that it is never left
+    partially written.
 """
 
 
@@ -19,6 +23,7 @@ save_json_file
 ### Python imports ###
 
 import json
+import os
 
 
 #################
@@ -60,5 +65,28 @@ def save_json_file(file_path: str, dict_to_save: dict) -> None:
     -------
     None
     """
-    with open(file_path, "w", encoding="utf-8") as file:
-        json.dump(dict_to_save, file, indent=4)
+    write_file_atomically(file_path, json.dumps(dict_to_save, indent=4))
+
+def write_file_atomically(file_path: str, text: str) -> None:
+    """
+    Write a text file through a temporary file, so that it is never left
+    partially written.
+
+    Parameters
+    ----------
+    file_path : str
+        Path of the file
+
+    text : str
+        Content of the file
+
+    Returns
+    -------
+    None
+    """
+    temporary_path = file_path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, file_path)
@@ -0,0 +1,120 @@
+"""
+Module to save the state of the current run, to resume it after the
+application has been killed while paused.
+
+Classes
+-------
+RunCheckpoint
+    File holding the state of the run interrupted.
+
+Variables
+---------
+run_checkpoint : RunCheckpoint
+    Single instance of the checkpoint, used by all modules.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Python imports ###
+
+import json
+import os
+
+### Module imports ###
+
+from tools.tools_constants import (
+    PATH_CHECKPOINT
+)
+from tools.tools_basis import (
+    write_file_atomically
+)
+from tools.tools_persistence import (
+    persistence
+)
+
+
+#################
+### Constants ###
+#################
+
+
+CHECKPOINT_VERSION = 1
+
+
+###############
+### Classes ###
+###############
+
+
+class RunCheckpoint():
+    """
+    File holding the state of the run interrupted.
+
+    The state is serialized on the main thread and written by the thread of
+    the persistence, after the documents waiting to be saved.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def save(self, state):
+        """
+        Save the state of the run.
+
+        Parameters
+        ----------
+        state : dict
+            State of the run, containing only json values.
+
+        Returns
+        -------
+        None
+        """
+        state["version"] = CHECKPOINT_VERSION
+        persistence.submit(
+            write_file_atomically, self.path,
+            json.dumps(state, separators=(",", ":")))
+
+    def load(self):
+        """
+        Return the state of the run saved, None if there is none or if it
+        was saved by another version of the game.
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+        except ValueError:
+            return None
+        if state.get("version") != CHECKPOINT_VERSION:
+            return None
+        return state
+
+    def clear(self):
+        """
+        Remove the state saved, once the run has resumed or ended.
+        """
+        persistence.submit(remove_file, self.path)
+
+
+#################
+### Functions ###
+#################
+
+
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+###############
+### Process ###
+###############
+
+
+run_checkpoint = RunCheckpoint(PATH_CHECKPOINT)
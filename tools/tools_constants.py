@@ -18,6 +18,15 @@ PATH_DATA_FOLDER : str
 PATH_SETTINGS : str
     Path to the json file of settings.
 
+PATH_RUN_STATS : str
+    Path to the binary file of the statistics of the runs.
+
+PATH_CHECKPOINT : str
+    Path to the json file of the state of the run interrupted.
+
+PATH_REPLAY : str
+    Path to the replay of the last run.
+
 PATH_RESOURCES_FOLDER : str
     Path to the resources folder.
 
@@ -53,12 +62,6 @@ from kivy.graphics import Color
 from kivy.core.window import Window
 
 
-from tools.tools_basis import (
-    load_json_file,
-    save_json_file
-)
-
-
 #################
 ### Constants ###
 #################
@@ -89,6 +92,10 @@ APPLICATION_NAME = "world_explorer"
 
 PATH_DATA_FOLDER = "data/"
 PATH_SETTINGS = PATH_DATA_FOLDER + "settings.json"
+PATH_SETTINGS_JOURNAL = PATH_DATA_FOLDER + "settings.journal"
+PATH_RUN_STATS = PATH_DATA_FOLDER + "run_stats.bin"
+PATH_CHECKPOINT = PATH_DATA_FOLDER + "checkpoint.json"
+PATH_REPLAY = PATH_DATA_FOLDER + "last_run.replay"
 
 PATH_RESOURCES_FOLDER = "resources/"
 PATH_LANGUAGE = PATH_RESOURCES_FOLDER + "languages/"
@@ -99,11 +106,33 @@ PATH_KIVY_FOLDER = PATH_RESOURCES_FOLDER + "kivy/"
 PATH_MAPS = PATH_RESOURCES_FOLDER + "maps/"
 PATH_CHARACTER_IMAGES = PATH_IMAGES + "ghost_textures/"
 PATH_LOGO = PATH_RESOURCES_FOLDER + "start_logo/"
+PATH_LOGO_ATLAS = PATH_ATLAS + "start_logo.atlas"
 PATH_SOUNDS = PATH_RESOURCES_FOLDER + "sounds/"
+PATH_SOUNDS_PCM = PATH_RESOURCES_FOLDER + "sounds_pcm/"
 PATH_MUSICS = PATH_RESOURCES_FOLDER + "musics/"
 PATH_FONTS = PATH_RESOURCES_FOLDER + "fonts/"
 PATH_TITLE_FONT = PATH_FONTS + "enchanted_land/Enchanted Land.otf"
 
+### Logo ###
+
+LOGO_FPS = 15
+# Number of frames of the logo whose decoding is requested in advance
+LOGO_FRAMES_AHEAD = 10
+
+### Screens ###
+
+# Module, class and kv file of each screen, loaded on its first display
+DICT_SCREENS = {
+    "menu": ("screens.menu", "MenuScreen", "menu.kv"),
+    "world_explorer": (
+        "tools.tools_world_explorer", "WorldExplorerScreen", "world_explorer.kv"),
+    "settings": ("screens.settings", "SettingsScreen", "settings.kv"),
+    "game_over": ("screens.game_over", "GameOverScreen", "game_over.kv"),
+    "collection": ("screens.collection", "CollectionScreen", "collection.kv")
+}
+# Screens built during the idle time of the menu, in this order
+LIST_WARM_UP_SCREENS = ["world_explorer", "game_over"]
+
 ### Language ###
 
 DICT_LANGUAGE_FONT = {
@@ -134,29 +163,15 @@ STOP = "STOP"
 INTERACT = "INTERACT"
 
 SPACE_KEY = "spacebar"
-SETTINGS = load_json_file(PATH_SETTINGS)
-INTERACT_KEY = SETTINGS["keys"][INTERACT]
-DICT_KEYS = SETTINGS["keys"]
-
-
-class MyCollection():
-    def __init__(self) -> None:
-        self.dict_collection = SETTINGS["collection"]
-        self.high_score = SETTINGS["high_score"]
-
-    def find_new_stone(self, stone_name):
-        self.dict_collection[DICT_TREASURE_STONES[stone_name]] = True
-        SETTINGS["collection"] = self.dict_collection
-        save_json_file(PATH_SETTINGS, SETTINGS)
-
-    def update_high_score(self, score):
-        if self.high_score < score:
-            self.high_score = score
-            SETTINGS["high_score"] = self.high_score
-            save_json_file(PATH_SETTINGS, SETTINGS)
-
-
-my_collection = MyCollection()
+# Time waited after a change of the settings before saving them, in s
+SETTINGS_SAVE_DELAY = 2
+# Sections of the settings whose changes are appended to the journal
+LIST_JOURNALED_SECTIONS = ["collection", "high_score"]
+# Number of records of the journal before the settings are saved again
+JOURNAL_MAX_RECORDS = 50
+# Maximal time waited for the files to be written when the application
+# stops, in s
+SAVE_WAIT_TIMEOUT = 5
 
 ######################
 ### World explorer ###
@@ -265,6 +280,25 @@ DICT_TILES_MOVEMENT = {
 MAX_TIME_IN_DARK = 10
 CHARACTER_MOVEMENT = 5
 
+### Simulation ###
+
+# Frequency of the simulation of the game, independent from the display FPS
+SIMULATION_FPS = 30
+SIMULATION_STEP = 1 / SIMULATION_FPS
+TUTORIAL_STEP = 3 / SIMULATION_FPS
+
+# Maximal number of steps simulated in a single frame to catch up
+MAX_SIMULATION_STEPS = 5
+
+### Replays ###
+
+# Record the inputs of the last run to simulate it again
+REPLAY_RECORDING = True
+# Variable of the environment holding the path of the replay to simulate
+REPLAY_ENVIRONMENT_VARIABLE = "LUMACRYTE_REPLAY"
+# Time spent simulating a replay between two frames, in seconds
+REPLAY_FRAME_BUDGET = 0.05
+
 
 ################
 ### Tutorial ###
@@ -291,9 +325,10 @@ NUMBER_TRIALS = 6
 ### Colors ###
 ##############
 
-NB_DARK_CIRCLES = 8
-DARKNESS_LIST = [Color(0.0, 0.0, 0.0, 1.0 - i * 0.7 / (NB_DARK_CIRCLES - 1))
-                 for i in range(NB_DARK_CIRCLES)]
+# Opacity of the darkness at the edge of the light circle
+DARKNESS_MIN_OPACITY = 0.3
+# Width of the light falloff, in tiles
+DARKNESS_FEATHER = 0.5
 
 DARKNESS_COLOR_BACK = Color(0.0, 0.0, 0.0, 0.3)
 MAX_CRYSTALS = 2
@@ -309,9 +344,77 @@ MAX_INTENSITY = 100
 
 SOUND_VOLUME = 0.5
 MUSIC_VOLUME = 0.5
+# Run the calls to the audio backend on a dedicated thread
+AUDIO_THREAD = True
+
+# Number of sound effects which can be played at the same time
+SOUND_VOICES = 8
+# Priority of the sound effects, the voices of the lowest are stolen first
+DICT_SOUND_PRIORITIES = {
+    "death": 3,
+    "start_beacon": 2,
+    "give_crystal": 2,
+    "darkness": 2,
+    "get_crystal": 1,
+    "near_beacon": 1,
+    "near_crystal": 1,
+    "flic": 0
+}
+DEFAULT_SOUND_PRIORITY = 1
 
 SOUND_RADIUS_CRYSTAL = 3
 SOUND_RADIUS_BEACON = 3
+# Sound emitted by each type of tile, and the radius where it is heard
+DICT_SOUND_SOURCES = {
+    "C": "near_crystal",
+    "B": "near_beacon"
+}
+DICT_SOUND_RADII = {
+    "near_crystal": SOUND_RADIUS_CRYSTAL,
+    "near_beacon": SOUND_RADIUS_BEACON
+}
+# Maximal number of updates of the volume of the sound sources per second
+SPATIAL_AUDIO_RATE = 10
 PROBABILITY_WATER_DROPS = 0.005
 
 GAME_OVER_FREEZE_TIME = 2
+
+### Statistics ###
+
+# Statistics saved for each run, with their format in the binary file
+LIST_RUN_STATS = [
+    ("score", "I"),
+    ("duration", "f"),
+    ("crystals_collected", "H"),
+    ("stones_collected", "H"),
+    ("beacons_lit", "H"),
+    ("distance_walked", "f"),
+    ("time_in_darkness", "f"),
+    ("chunks_generated", "H")
+]
+
+##############
+### Assets ###
+##############
+
+# Size in pixels of the textures in the full resolution atlases
+ATLAS_TEXTURE_SIZE = 100
+# Atlases displayed smaller than their tiles, which use mipmaps
+LIST_MIPMAPPED_ATLASES = ["map_textures"]
+
+# Assets loaded before displaying each screen, None to load a whole registry
+# The musics are streamed, so they are only opened when played
+DICT_SCREEN_ASSETS = {
+    "world_explorer": {
+        "textures": None,
+        "sounds": None
+    },
+    "collection": {
+        "textures": list(DICT_TREASURE_STONES.values())
+    }
+}
+
+# Screens whose assets are loaded in the background during the logo
+PRELOAD_SCREENS = ["menu", "world_explorer", "game_over", "collection"]
+# Time spent at most on each frame to create the textures preloaded, in s
+PRELOAD_FRAME_BUDGET = 0.004
@@ -3,45 +3,75 @@ Module to create visual effects with kivy
 """
 
 from kivy.uix.widget import Widget
-from kivy.graphics import Line, Rectangle
+from kivy.graphics import Rectangle, RenderContext
 
 
 from tools.tools_constants import (
-    DARKNESS_LIST,
     DARKNESS_COLOR_BACK,
-    NB_DARK_CIRCLES,
-    MAP_SIZE,
-    Window,
-    CASES_ON_WIDTH
+    DARKNESS_FEATHER,
+    DARKNESS_MIN_OPACITY
+)
+from tools.tools_viewport import (
+    viewport
 )
 
 
-def change_window_size(*args):
-    global WINDOW_SIZE, SCREEN_RATIO, TILE_SIZE
-
-    # Compute the size of one tile in pixel
-    WINDOW_SIZE = Window.size
-    SCREEN_RATIO = WINDOW_SIZE[0] / WINDOW_SIZE[1]
-    TILE_SIZE = WINDOW_SIZE[0] / CASES_ON_WIDTH
+# Radial falloff of the light around the beacon, computed for each pixel
+# from its position in the rectangle, so that it does not depend on where
+# the canvas is drawn (window, fbo of a transition or of a screenshot)
+DARKNESS_SHADER = """
+$HEADER$
 
+uniform vec2 center;
+uniform vec2 area_size;
+uniform float radius;
+uniform float feather;
+uniform float min_opacity;
 
-Window.bind(on_resize=change_window_size)
-change_window_size()
+void main(void) {
+    float distance_center = distance(tex_coord0 * area_size, center);
+    float opacity = step(radius - feather, distance_center) * mix(
+        min_opacity, 1.0, smoothstep(radius - feather, radius, distance_center));
+    gl_FragColor = vec4(0.0, 0.0, 0.0, opacity);
+}
+"""
 
 
 class AmbientDarkness(Widget):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.canvas.add(DARKNESS_COLOR_BACK)
-        self.canvas.add(Rectangle(pos=(0, 0), size=(
-            WINDOW_SIZE[0], WINDOW_SIZE[1])))
+        self.rectangle = Rectangle(pos=(0, 0), size=viewport.window_size)
+        self.canvas.add(self.rectangle)
+
+    def rescale(self):
+        self.rectangle.size = viewport.window_size
 
 
 class CircleDarkness(Widget):
+    """
+    Darkness covering the screen except for a circle of light.
+
+    The geometry is a single rectangle built once, the light falloff is
+    computed by a shader whose uniforms are updated at each draw. The
+    center of the light is given relative to the rectangle.
+    """
+
     def __init__(self, radius, **kwargs):
+        self.canvas = RenderContext(
+            use_parent_projection=True,
+            use_parent_modelview=True,
+            use_parent_frag_modelview=True)
+        self.canvas.shader.fs = DARKNESS_SHADER
         super().__init__(**kwargs)
         self.radius = radius
-        self.radius_line = MAP_SIZE * TILE_SIZE * 2
+        # Texture coordinates going up from the bottom left corner, which
+        # give each pixel its position in the rectangle
+        self.rectangle = Rectangle(
+            pos=(0, 0), size=viewport.window_size,
+            tex_coords=(0, 0, 1, 0, 1, 1, 0, 1))
+        self.canvas.add(self.rectangle)
+        self.canvas["min_opacity"] = DARKNESS_MIN_OPACITY
         self.update()
         self.draw()
 
@@ -49,12 +79,16 @@ class CircleDarkness(Widget):
         self.radius = new_radius
         self.update()
 
+    def rescale(self):
+        self.rectangle.size = viewport.window_size
+        self.update()
+
     def update(self):
-        self.line_width = self.radius_line - self.radius * TILE_SIZE
+        self.canvas["area_size"] = tuple(map(float, self.rectangle.size))
+        self.canvas["radius"] = float(self.radius * viewport.tile_size)
+        self.canvas["feather"] = float(DARKNESS_FEATHER * viewport.tile_size)
 
     def draw(self):
-        self.canvas.clear()
-        for i in range(NB_DARK_CIRCLES):
-            self.canvas.add(DARKNESS_LIST[i])
-            self.canvas.add(
-                Line(circle=(self.x, self.y, self.radius_line), width=self.line_width + TILE_SIZE * 0.5 * i / (NB_DARK_CIRCLES - 1)))
+        self.canvas["center"] = (
+            float(self.x - self.rectangle.pos[0]),
+            float(self.y - self.rectangle.pos[1]))
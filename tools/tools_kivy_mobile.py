@@ -19,23 +19,11 @@ from kivy.uix.widget import Widget
 
 ### Module imports ###
 
-from tools.tools_constants import (
-    Window
+from tools.tools_viewport import (
+    viewport
 )
 
 
-def change_window_size(*args):
-    global WINDOW_SIZE, SCREEN_RATIO
-
-    # Compute the size of one tile in pixel
-    WINDOW_SIZE = Window.size
-    SCREEN_RATIO = WINDOW_SIZE[0] / WINDOW_SIZE[1]
-
-
-Window.bind(on_resize=change_window_size)
-change_window_size()
-
-
 def apply_boundaries(x, min_x, max_x):
     if x > max_x:
         return max_x
@@ -64,8 +52,9 @@ class MobileJoystick():
         self.height = 0.12
         self.extension_factor = 2
         self.is_active = False
+        self.has_changed = True
         self.widget = Widget(pos_hint={"center_x": self.center_x, "center_y": self.center_y}, size_hint=(
-            self.width * self.extension_factor, self.height * self.extension_factor * SCREEN_RATIO))
+            self.width * self.extension_factor, self.height * self.extension_factor * viewport.screen_ratio))
         layout.add_widget(self.widget)
         self.back_to_zero()
         self.widget.bind(on_touch_move=self.on_touch_move)
@@ -74,36 +63,38 @@ class MobileJoystick():
         self.draw()
 
     def on_touch_move(self, el, touch):
-        if touch.x < WINDOW_SIZE[0] // 2:
+        if touch.x < viewport.window_size[0] // 2:
             self.x = touch.x
             self.y = touch.y
+            self.has_changed = True
 
     def on_touch_down(self, el, touch):
-        if touch.x < WINDOW_SIZE[0] // 2:
+        if touch.x < viewport.window_size[0] // 2:
             self.is_active = True
+            self.has_changed = True
 
     def on_touch_up(self, el, touch):
-        if touch.x < WINDOW_SIZE[0] // 2:
+        if touch.x < viewport.window_size[0] // 2:
             self.is_active = False
             self.back_to_zero()
             self.draw()
 
     def back_to_zero(self):
-        self.x = self.center_x * WINDOW_SIZE[0]
-        self.y = self.center_y * WINDOW_SIZE[1]
+        self.x = self.center_x * viewport.window_size[0]
+        self.y = self.center_y * viewport.window_size[1]
 
     def draw(self):
         self.widget.pos_hint = {
             "center_x": self.center_x, "center_y": self.center_y}
         self.widget.size_hint = (self.width * self.extension_factor,
-                                 self.height * self.extension_factor * SCREEN_RATIO)
+                                 self.height * self.extension_factor * viewport.screen_ratio)
         self.widget.canvas.clear()
         # Réglage de la couleur
         self.widget.canvas.add(TRANSPARENT_WHITE)
         # Affichage du cercle extérieur
-        self.main_center_x = self.center_x * WINDOW_SIZE[0]
-        self.main_center_y = self.center_y * WINDOW_SIZE[1]
-        main_radius = self.width * WINDOW_SIZE[1]
+        self.main_center_x = self.center_x * viewport.window_size[0]
+        self.main_center_y = self.center_y * viewport.window_size[1]
+        main_radius = self.width * viewport.window_size[1]
         self.norme_cercle = main_radius
         self.widget.canvas.add(
             Line(circle=(self.main_center_x, self.main_center_y, main_radius), width=5))
@@ -133,7 +124,15 @@ class MobileJoystick():
                 return 0, 0
 
     def recursive_update(self):
-        self.draw()
+        # Only redraw the joystick when it has been touched
+        if self.has_changed:
+            self.draw()
+            self.has_changed = False
+
+    def rescale(self):
+        if not self.is_active:
+            self.back_to_zero()
+        self.has_changed = True
 
 
 class MobileButton():
@@ -146,7 +145,7 @@ class MobileButton():
         self.is_active = False
         self.last_state = True
         self.widget = Widget(pos_hint={"center_x": self.center_x, "center_y": self.center_y}, size_hint=(
-            self.width * self.extension_factor, self.height * self.extension_factor * SCREEN_RATIO))
+            self.width * self.extension_factor, self.height * self.extension_factor * viewport.screen_ratio))
         layout.add_widget(self.widget)
         self.widget.bind(on_touch_move=self.on_touch_move)
         self.widget.bind(on_touch_down=self.on_touch_down)
@@ -157,19 +156,19 @@ class MobileButton():
         return self.is_active
 
     def on_touch_move(self, el, touch):
-        if touch.x > WINDOW_SIZE[0] // 2:
+        if touch.x > viewport.window_size[0] // 2:
             if self.widget.collide_point(touch.x, touch.y):
                 self.is_active = True
             else:
                 self.is_active = False
 
     def on_touch_down(self, el, touch):
-        if touch.x > WINDOW_SIZE[0] // 2:
+        if touch.x > viewport.window_size[0] // 2:
             if self.widget.collide_point(touch.x, touch.y):
                 self.is_active = True
 
     def on_touch_up(self, el, touch):
-        if touch.x > WINDOW_SIZE[0] // 2:
+        if touch.x > viewport.window_size[0] // 2:
             if self.widget.collide_point(touch.x, touch.y):
                 self.is_active = False
 
@@ -177,7 +176,7 @@ class MobileButton():
         self.widget.pos_hint = {
             "center_x": self.center_x, "center_y": self.center_y}
         self.widget.size_hint = (self.width * self.extension_factor,
-                                 self.height * self.extension_factor * SCREEN_RATIO)
+                                 self.height * self.extension_factor * viewport.screen_ratio)
         if self.last_state != self.is_active:
             self.widget.canvas.clear()
             # Réglage de la couleur
@@ -186,12 +185,19 @@ class MobileButton():
             else:
                 self.widget.canvas.add(TRANSPARENT_WHITE)
             # Affichage du cercle extérieur
-            self.main_center_x = self.center_x * WINDOW_SIZE[0]
-            self.main_center_y = self.center_y * WINDOW_SIZE[1]
-            main_radius = self.width * WINDOW_SIZE[1]
+            self.main_center_x = self.center_x * viewport.window_size[0]
+            self.main_center_y = self.center_y * viewport.window_size[1]
+            main_radius = self.width * viewport.window_size[1]
             self.widget.canvas.add(
                 Line(circle=(self.main_center_x, self.main_center_y, main_radius), width=5))
         self.last_state = self.is_active
 
     def recursive_update(self):
+        # Only redraw the button when its state has changed
+        if self.last_state != self.is_active:
+            self.draw()
+
+    def rescale(self):
+        # Force the redraw of the button
+        self.last_state = None
         self.draw()
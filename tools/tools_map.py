@@ -10,7 +10,9 @@ from tools.tools_constants import (
     DICT_ORIENTATIONS,
     NUMBER_TRIALS,
     PRECIOUS_STONE_PROBABILITY,
-    DICT_TREASURE_STONES,
+    DICT_TREASURE_STONES
+)
+from tools.tools_settings import (
     my_collection
 )
 
@@ -24,8 +26,8 @@ def get_position_from_direction(direction, position):
     if direction == DICT_ORIENTATIONS["left"]:
         return (position[0]-1, position[1])
 
-def choose_random_direction():
-    direction = rd.choice(list(DICT_ORIENTATIONS.values()))
+def choose_random_direction(random_generator=rd):
+    direction = random_generator.choice(list(DICT_ORIENTATIONS.values()))
     return direction
 
 def check_position_valid(position, list_elements):
@@ -37,12 +39,12 @@ def check_position_valid(position, list_elements):
         return False
     return True
 
-def dig_ways(list_elements, grid_map, number_cases_digger):
+def dig_ways(list_elements, grid_map, number_cases_digger, random_generator=rd):
     for position in list_elements:
         for counter in range(number_cases_digger):
             counter_trials = 0
             while counter_trials < NUMBER_TRIALS:
-                direction = choose_random_direction()
+                direction = choose_random_direction(random_generator)
                 new_position = get_position_from_direction(direction, position)
                 if check_position_valid(new_position, list_elements):
                     grid_map[new_position[1]][new_position[0]] = "G"
@@ -53,9 +55,9 @@ def dig_ways(list_elements, grid_map, number_cases_digger):
                 break
     return grid_map
 
-def create_new_map(list_precious_stones, has_beacon=False):
+def create_new_map(list_precious_stones, has_beacon=False, random_generator=rd):
     """
-    Create a map
+    Create a map, drawing its elements with the random generator given
     """
 
     # Initialisation with only rocks
@@ -74,15 +76,15 @@ def create_new_map(list_precious_stones, has_beacon=False):
     # Place the crystals
     for counter_y in range(MAP_SIZE):
         for counter_x in range(MAP_SIZE):
-            if rd.random() <= CRYSTAL_PROBABILITY:
+            if random_generator.random() <= CRYSTAL_PROBABILITY:
                 grid_map[counter_y][counter_x] = "C"
                 list_elements.append((counter_x, counter_y))
 
     # Place the precious stones
     for counter_y in range(MAP_SIZE):
         for counter_x in range(MAP_SIZE):
-            if rd.random() <= PRECIOUS_STONE_PROBABILITY:
-                precious_stone_code = rd.choice(list(DICT_TREASURE_STONES.keys()))
+            if random_generator.random() <= PRECIOUS_STONE_PROBABILITY:
+                precious_stone_code = random_generator.choice(list(DICT_TREASURE_STONES.keys()))
                 if precious_stone_code not in list_precious_stones and (
                     not my_collection.dict_collection[
                     DICT_TREASURE_STONES[precious_stone_code]]):
@@ -129,7 +131,8 @@ def create_new_map(list_precious_stones, has_beacon=False):
         new_grid_map = dig_ways(
             list_elements=list_elements,
             grid_map=copy.deepcopy(grid_map),
-            number_cases_digger=number_cases_digger)
+            number_cases_digger=number_cases_digger,
+            random_generator=random_generator)
 
         # Only the map with the beacon interests us
         if not has_beacon:
@@ -0,0 +1,306 @@
+"""
+Module to save the json files of the application without blocking the
+frames of the game.
+
+The documents are kept in memory and only marked as changed. They are
+written a short time after their last change, or at once at the safe
+points of the application (pause, game over, stop), by a background
+thread. Each file is written atomically, so that a crash during a write
+never leaves a truncated file.
+
+A document can also have a journal, where its small changes are appended
+as records of a few bytes instead of writing the whole document. The
+journal is replayed over the document when it is loaded, and emptied each
+time the whole document is written.
+
+Classes
+-------
+PersistenceService
+    Write-behind store of the json documents of the application.
+
+Functions
+---------
+encode_record
+    Return the line of the journal recording a change of a document.
+
+decode_record
+    Return the change recorded in a line of the journal.
+
+replay_journal
+    Apply to a document the changes recorded in its journal.
+
+Variables
+---------
+persistence : PersistenceService
+    Single instance of the service, used for all the documents.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Python imports ###
+
+import json
+import os
+import queue
+import threading
+import zlib
+
+### Kivy imports ###
+
+from kivy.clock import Clock
+
+### Module imports ###
+
+from tools.tools_constants import (
+    REPLAY_ENVIRONMENT_VARIABLE,
+    SAVE_WAIT_TIMEOUT
+)
+from tools.tools_basis import (
+    load_json_file,
+    write_file_atomically
+)
+
+
+###############
+### Classes ###
+###############
+
+
+class PersistenceService():
+    """
+    Write-behind store of the json documents of the application.
+
+    The documents are serialized on the main thread, where they are
+    modified, and written by a single background thread in the order of the
+    requests, so that an older version never overwrites a newer one.
+    """
+
+    def __init__(self):
+        self.dict_documents = {}
+        self.dict_delays = {}
+        self.dict_journals = {}
+        self.dict_journal_records = {}
+        self.dict_max_records = {}
+        self.set_dirty_paths = set()
+        self.flush_event = None
+        self.queue_commands = queue.SimpleQueue()
+        self.thread = None
+        # Disabled when a replay is simulated, to leave the files unchanged
+        self.is_enabled = True
+
+    def load_document(self, path, delay, journal_path=None, max_records=0):
+        """
+        Load a document and register it to save its changes.
+
+        Parameters
+        ----------
+        path : str
+            Path of the json file.
+        delay : float
+            Time waited after a change before writing the document, in
+            seconds, so that several changes are written at once.
+        journal_path : str, optional
+            Path of the journal of the document, None if it has none.
+        max_records : int, optional
+            Number of records of the journal above which the document is
+            written again and its journal emptied.
+
+        Returns
+        -------
+        dict
+            Document kept in memory, to modify in place.
+        """
+        document = load_json_file(path)
+        self.dict_documents[path] = document
+        self.dict_delays[path] = delay
+        if journal_path is not None:
+            self.dict_journals[path] = journal_path
+            self.dict_max_records[path] = max_records
+            self.dict_journal_records[path] = 0
+            # Write the changes recovered, which also drops a torn record,
+            # unless the files must be left unchanged
+            if (replay_journal(document, journal_path) > 0 or
+                    os.path.exists(journal_path)) and self.is_enabled:
+                self.set_dirty_paths.add(path)
+                self.flush()
+        return document
+
+    def mark_dirty(self, path):
+        """
+        Tell that a document has changed, to write it later.
+        """
+        self.set_dirty_paths.add(path)
+        if self.flush_event is None:
+            self.flush_event = Clock.schedule_once(
+                self.flush, self.dict_delays[path])
+
+    def append_record(self, path, section, key, value):
+        """
+        Record a change of a document in its journal, without writing the
+        whole document.
+
+        Parameters
+        ----------
+        path : str
+            Path of the json file of the document.
+        section : str
+            Section of the document changed.
+        key : str
+            Key changed in the section, None if the whole section changed.
+        value
+            New value.
+
+        Returns
+        -------
+        None
+        """
+        # Journaled even when the document waits to be written, so that the
+        # change survives a crash before this write
+        self.dict_journal_records[path] += 1
+        if self.dict_journal_records[path] > self.dict_max_records[path]:
+            self.set_dirty_paths.add(path)
+            self.flush()
+            return
+        self.submit(
+            append_line, self.dict_journals[path],
+            encode_record(section, key, value))
+
+    def flush(self, *args, wait=False):
+        """
+        Write the documents changed on the background thread.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Whether to wait for the files to be written, when the
+            application is about to stop, at most SAVE_WAIT_TIMEOUT.
+
+        Returns
+        -------
+        None
+        """
+        if self.flush_event is not None:
+            self.flush_event.cancel()
+            self.flush_event = None
+        for path in self.set_dirty_paths:
+            self.submit(
+                write_document, path,
+                json.dumps(self.dict_documents[path], indent=4),
+                self.dict_journals.get(path))
+            if path in self.dict_journals:
+                self.dict_journal_records[path] = 0
+        self.set_dirty_paths.clear()
+
+        if wait and self.thread is not None and self.is_enabled:
+            event_written = threading.Event()
+            self.submit(event_written.set)
+            if not event_written.wait(SAVE_WAIT_TIMEOUT):
+                print("The files are still being saved")
+
+    def submit(self, function, *args):
+        if not self.is_enabled:
+            return
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self.run, name="persistence", daemon=True)
+            self.thread.start()
+        self.queue_commands.put((function, args))
+
+    def run(self):
+        while True:
+            function, args = self.queue_commands.get()
+            try:
+                function(*args)
+            except Exception as error:
+                # The document stays in memory and is written at its next
+                # change, and the thread goes on with the next commands
+                print("Unable to save", args[0] if args else function, error)
+
+
+#################
+### Functions ###
+#################
+
+
+def encode_record(section, key, value):
+    """
+    Return the line of the journal recording a change of a document,
+    starting with its checksum to detect a record partially written.
+    """
+    record = json.dumps([section, key, value], separators=(",", ":"))
+    return f"{zlib.crc32(record.encode('utf-8')):08x} {record}\n"
+
+
+def decode_record(line):
+    """
+    Return the section, the key and the value recorded in a line of the
+    journal, None if the line is incomplete or corrupted.
+    """
+    if not line.endswith("\n") or len(line) < 10:
+        return None
+    checksum, record = line[:8], line[9:-1]
+    if checksum != f"{zlib.crc32(record.encode('utf-8')):08x}":
+        return None
+    return json.loads(record)
+
+
+def replay_journal(document, journal_path):
+    """
+    Apply to a document the changes recorded in its journal, until the end
+    of the journal or its first corrupted record.
+
+    Returns
+    -------
+    int
+        Number of changes applied.
+    """
+    if not os.path.exists(journal_path):
+        return 0
+    number_records = 0
+    with open(journal_path, "r", encoding="utf-8") as file:
+        for line in file:
+            record = decode_record(line)
+            if record is None:
+                break
+            section, key, value = record
+            if key is None:
+                document[section] = value
+            else:
+                document.setdefault(section, {})[key] = value
+            number_records += 1
+    return number_records
+
+
+def append_line(file_path, line):
+    with open(file_path, "a", encoding="utf-8") as file:
+        file.write(line)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def write_document(path, text, journal_path):
+    """
+    Write a document, then empty its journal, whose records it contains.
+
+    Replaying the journal again after a crash between both steps does no
+    harm, since each record only sets a value.
+    """
+    write_file_atomically(path, text)
+    if journal_path is not None and os.path.exists(journal_path):
+        os.remove(journal_path)
+
+
+###############
+### Process ###
+###############
+
+
+persistence = PersistenceService()
+# Disabled before any document is loaded when a replay is simulated, so
+# that the journals recovered are not written either
+if os.environ.get(REPLAY_ENVIRONMENT_VARIABLE, "") != "":
+    persistence.is_enabled = False
@@ -0,0 +1,335 @@
+"""
+Module to record the start of the application: its phases, its
+milestones and the time spent in each module import.
+
+It only relies on the standard library so that it can be imported before
+Kivy, whose import is part of what it measures. The profiler is enabled by
+setting the environment variable LUMACRYTE_STARTUP_TRACE to the path of the
+report to write, or to 1 to use the default path. The reports are checked
+and compared with startup_profiler.py.
+
+Classes
+-------
+StartupProfiler
+    Recorder of the phases, milestones and imports of the start.
+
+Variables
+---------
+profiler : StartupProfiler
+    Single instance of the profiler, disabled unless requested.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Python imports ###
+
+import importlib.abc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+
+#################
+### Constants ###
+#################
+
+
+TRACE_ENVIRONMENT_VARIABLE = "LUMACRYTE_STARTUP_TRACE"
+EXIT_ENVIRONMENT_VARIABLE = "LUMACRYTE_STARTUP_EXIT"
+MEMORY_ENVIRONMENT_VARIABLE = "LUMACRYTE_STARTUP_MEMORY"
+FINAL_MARK_ENVIRONMENT_VARIABLE = "LUMACRYTE_STARTUP_FINAL_MARK"
+DEFAULT_REPORT_PATH = "reports/startup_report.json"
+
+# Milestones of the start, in the order they are reached
+LIST_MARKS = ["logo_first_frame", "menu_first_frame", "world_first_update"]
+DEFAULT_FINAL_MARK = "menu_first_frame"
+
+
+###############
+### Classes ###
+###############
+
+
+class TimedLoader():
+    """
+    Loader measuring the execution of the module of another loader.
+    """
+
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        create_module = getattr(self.loader, "create_module", None)
+        if create_module is None:
+            return None
+        return create_module(spec)
+
+    def exec_module(self, module):
+        self.profiler.begin_import(module.__name__)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler.end_import(module.__name__)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Finder wrapping the loaders found by the other finders into TimedLoader.
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self.profiler)
+        return spec
+
+
+class StartupProfiler():
+    """
+    Recorder of the phases, milestones and imports of the start.
+
+    The phases are consecutive: entering a phase ends the previous one. All
+    the methods do nothing while the profiler is disabled, so that the
+    application can call them unconditionally.
+    """
+
+    def __init__(self):
+        self.is_enabled = False
+        self.is_tracing_memory = False
+        self.report_path = DEFAULT_REPORT_PATH
+        self.exit_when_finished = False
+        self.final_mark = DEFAULT_FINAL_MARK
+        self.import_timer = ImportTimer(self)
+        self.start_time = None
+        self.current_phase = None
+        self.list_phases = []
+        self.dict_marks = {}
+        self.dict_imports = {}
+        self.import_stack = []
+
+    def start(self, report_path=DEFAULT_REPORT_PATH, trace_memory=True,
+              exit_when_finished=False, final_mark=DEFAULT_FINAL_MARK):
+        """
+        Start recording the imports and the phases.
+
+        Parameters
+        ----------
+        report_path : str, optional
+            Path of the JSON report written when the profiler is finished.
+        trace_memory : bool, optional
+            Whether to trace the memory allocated by Python, which slows
+            down the start.
+        exit_when_finished : bool, optional
+            Whether the application should stop once the report is written.
+        final_mark : str, optional
+            Milestone ending the trace, among LIST_MARKS.
+
+        Returns
+        -------
+        None
+        """
+        self.is_enabled = True
+        self.report_path = report_path
+        self.exit_when_finished = exit_when_finished
+        self.final_mark = final_mark
+        self.is_tracing_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.start_time = time.perf_counter()
+        sys.meta_path.insert(0, self.import_timer)
+
+    def start_from_environment(self):
+        """
+        Start the profiler if it has been requested by the environment.
+        """
+        report_path = os.environ.get(TRACE_ENVIRONMENT_VARIABLE, "")
+        if report_path in ("", "0"):
+            return
+        if report_path == "1":
+            report_path = DEFAULT_REPORT_PATH
+        self.start(
+            report_path=report_path,
+            trace_memory=os.environ.get(MEMORY_ENVIRONMENT_VARIABLE) != "0",
+            exit_when_finished=os.environ.get(EXIT_ENVIRONMENT_VARIABLE) == "1",
+            final_mark=os.environ.get(
+                FINAL_MARK_ENVIRONMENT_VARIABLE, DEFAULT_FINAL_MARK))
+
+    def get_time(self):
+        return time.perf_counter() - self.start_time
+
+    def get_memory(self):
+        """
+        Return the current memory allocated by Python in megabytes.
+        """
+        if not self.is_tracing_memory:
+            return 0.
+        return tracemalloc.get_traced_memory()[0] / 1e6
+
+    def enter_phase(self, name):
+        """
+        End the current phase and start a new one.
+
+        Parameters
+        ----------
+        name : str
+            Name of the new phase.
+
+        Returns
+        -------
+        None
+        """
+        if not self.is_enabled:
+            return
+        self.end_phase()
+        # Before Python 3.9, the peak of a phase is the peak since the start,
+        # which still gives the peak of the whole start
+        if self.is_tracing_memory and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self.current_phase = {
+            "name": name,
+            "start": self.get_time(),
+            "memory_start": self.get_memory()
+        }
+
+    def end_phase(self):
+        """
+        End the current phase, if any, and record it.
+        """
+        if not self.is_enabled or self.current_phase is None:
+            return
+        phase = self.current_phase
+        memory_peak = 0.
+        if self.is_tracing_memory:
+            memory_peak = tracemalloc.get_traced_memory()[1] / 1e6
+        self.list_phases.append({
+            "name": phase["name"],
+            "start": phase["start"],
+            "duration": self.get_time() - phase["start"],
+            "memory": self.get_memory() - phase["memory_start"],
+            "memory_peak": memory_peak
+        })
+        self.current_phase = None
+
+    def mark(self, name):
+        """
+        Record the first time a milestone of the start is reached.
+        """
+        if self.is_enabled and name not in self.dict_marks:
+            self.dict_marks[name] = self.get_time()
+
+    def reach(self, name):
+        """
+        Record a milestone and finish the trace when it is the final one.
+
+        Parameters
+        ----------
+        name : str
+            Name of the milestone.
+
+        Returns
+        -------
+        bool
+            Whether the report has just been written.
+        """
+        if not self.is_enabled:
+            return False
+        self.mark(name)
+        if name != self.final_mark:
+            return False
+        self.finish()
+        return True
+
+    def begin_import(self, module_name):
+        self.import_stack.append(
+            [module_name, time.perf_counter(), 0., self.get_memory()])
+
+    def end_import(self, module_name):
+        name, start, children_time, memory_start = self.import_stack.pop()
+        cumulative_time = time.perf_counter() - start
+        if self.import_stack:
+            self.import_stack[-1][2] += cumulative_time
+        self.dict_imports[name] = {
+            "self": cumulative_time - children_time,
+            "cumulative": cumulative_time,
+            "memory": self.get_memory() - memory_start,
+            "parent": self.import_stack[-1][0] if self.import_stack else None
+        }
+
+    def build_report(self):
+        """
+        Return the report of the start as a dictionary.
+        """
+        list_imports = sorted(
+            ({"module": name, **record}
+             for name, record in self.dict_imports.items()),
+            key=lambda record: record["self"], reverse=True)
+        memory_peak = max(
+            [phase["memory_peak"] for phase in self.list_phases] + [0.])
+        return {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "memory_traced": self.is_tracing_memory,
+            "final_mark": self.final_mark,
+            "total_time": self.get_time(),
+            "import_time": sum(
+                record["self"] for record in self.dict_imports.values()),
+            "memory_peak": memory_peak,
+            "phases": self.list_phases,
+            "marks": self.dict_marks,
+            "imports": list_imports
+        }
+
+    def finish(self):
+        """
+        Stop recording and write the report.
+
+        Returns
+        -------
+        dict
+            Report of the start, None if the profiler was disabled.
+        """
+        if not self.is_enabled:
+            return None
+        self.end_phase()
+        if self.import_timer in sys.meta_path:
+            sys.meta_path.remove(self.import_timer)
+        report = self.build_report()
+        if self.is_tracing_memory:
+            tracemalloc.stop()
+        self.is_enabled = False
+
+        folder = os.path.dirname(self.report_path)
+        if folder != "":
+            os.makedirs(folder, exist_ok=True)
+        with open(self.report_path, "w", encoding="UTF-8") as file:
+            json.dump(report, file, indent=4)
+        return report
+
+
+###############
+### Process ###
+###############
+
+
+profiler = StartupProfiler()
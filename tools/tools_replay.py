@@ -0,0 +1,333 @@
+"""
+Module to record the runs of the player and to simulate them again.
+
+The simulation of a run only depends on the seed of its random generator,
+on the collection of the player when it starts, and on the inputs of each
+step of the game. A replay stores them in a binary file: a header with the
+seed and the collection, followed by a record each time the inputs change,
+and a last record with the score of the run when it ends.
+
+The game records the last run in data/last_run.replay. The replay is then
+simulated again, without saving anything, with replay_simulator.py.
+
+Classes
+-------
+ReplayRecorder
+    Recorder of the inputs of the current run.
+
+ReplayPlayer
+    Source of the inputs of a run recorded, simulated again.
+
+Functions
+---------
+encode_collection
+    Return the bit mask of the precious stones found in a collection.
+
+decode_collection
+    Return the collection corresponding to a bit mask.
+
+Variables
+---------
+replay_recorder : ReplayRecorder
+    Single instance of the recorder, used by the game.
+
+replay_player : ReplayPlayer
+    Single instance of the player, active only when simulating a replay.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Python imports ###
+
+import os
+import struct
+import time
+
+### Module imports ###
+
+from tools.tools_constants import (
+    PATH_REPLAY,
+    REPLAY_RECORDING,
+    REPLAY_ENVIRONMENT_VARIABLE,
+    DICT_TREASURE_STONES
+)
+from tools.tools_persistence import (
+    persistence
+)
+from tools.tools_settings import (
+    settings
+)
+
+
+#################
+### Constants ###
+#################
+
+
+REPLAY_MAGIC = b"LRPL"
+REPLAY_VERSION = 1
+
+# Magic, version, seed and collection of the run
+HEADER_STRUCT = struct.Struct("<4sHII")
+# Kind, step, movement on both axes and number of interactions for the
+# inputs, or score for the end of the run
+RECORD_STRUCT = struct.Struct("<BIddI")
+RECORD_INPUTS = 0
+RECORD_END = 1
+
+
+###############
+### Classes ###
+###############
+
+
+class ReplayRecorder():
+    """
+    Recorder of the inputs of the current run.
+
+    The records are kept in memory and appended to the file by the thread of
+    the persistence when the run ends or when the application is paused.
+    """
+
+    def __init__(self, path, is_enabled):
+        self.path = path
+        self.is_enabled = is_enabled
+        self.is_recording = False
+        self.pending_records = bytearray()
+        self.last_inputs = None
+
+    def start(self, seed, dict_collection):
+        """
+        Start the record of a new run.
+
+        Parameters
+        ----------
+        seed : int
+            Seed of the random generator of the run.
+        dict_collection : dict
+            Collection of the player at the start of the run.
+
+        Returns
+        -------
+        None
+        """
+        if not self.is_enabled:
+            return
+        self.is_recording = True
+        self.pending_records = bytearray()
+        self.last_inputs = (0, 0, 0)
+        persistence.submit(
+            write_bytes, self.path,
+            HEADER_STRUCT.pack(
+                REPLAY_MAGIC, REPLAY_VERSION, seed,
+                encode_collection(dict_collection)))
+
+    def record_inputs(self, step, x_movement, y_movement,
+                      number_interactions):
+        """
+        Record the inputs of a step of the game, if they have changed since
+        the previous step.
+        """
+        if not self.is_recording:
+            return
+        inputs = (x_movement, y_movement, number_interactions)
+        if inputs != self.last_inputs:
+            self.last_inputs = inputs
+            self.pending_records += RECORD_STRUCT.pack(
+                RECORD_INPUTS, step, *inputs)
+
+    def finish(self, step, score):
+        """
+        Record the end of the run and write the records.
+        """
+        if not self.is_recording:
+            return
+        self.pending_records += RECORD_STRUCT.pack(
+            RECORD_END, step, 0, 0, score)
+        self.flush()
+        self.is_recording = False
+
+    def flush(self):
+        """
+        Append the records pending to the file.
+        """
+        if self.pending_records:
+            persistence.submit(
+                append_bytes, self.path, bytes(self.pending_records))
+            self.pending_records = bytearray()
+
+
+class ReplayPlayer():
+    """
+    Source of the inputs of a run recorded, simulated again.
+
+    When a replay is simulated, the game takes its inputs from the player
+    instead of the keyboard, and nothing is saved.
+    """
+
+    def __init__(self):
+        self.is_active = False
+        self.seed = None
+        self.dict_collection = None
+        self.list_records = []
+        self.counter_record = 0
+        self.inputs = (0, 0, 0)
+        self.end = None
+        self.result = None
+        self.start_time = None
+
+    def start_from_environment(self):
+        """
+        Load the replay requested by the environment, if any.
+        """
+        path = os.environ.get(REPLAY_ENVIRONMENT_VARIABLE, "")
+        if path != "":
+            self.load(path)
+
+    def load(self, path):
+        """
+        Load a replay and disable the saves of the application.
+
+        Parameters
+        ----------
+        path : str
+            Path of the replay.
+
+        Returns
+        -------
+        None
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, self.seed, collection_mask = \
+            HEADER_STRUCT.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(path + " is not a replay of this version")
+        self.dict_collection = decode_collection(collection_mask)
+
+        # Ignore a last record partially written
+        data = data[HEADER_STRUCT.size:]
+        data = data[:len(data) - len(data) % RECORD_STRUCT.size]
+        for kind, step, x_movement, y_movement, value in \
+                RECORD_STRUCT.iter_unpack(data):
+            if kind == RECORD_END:
+                self.end = (step, value)
+                break
+            self.list_records.append(
+                (step, (x_movement, y_movement, value)))
+
+        # Generate the maps with the collection of the run, without saving
+        # the changes of the simulation
+        persistence.is_enabled = False
+        settings.get("collection").update(self.dict_collection)
+        self.is_active = True
+
+    def start(self):
+        """
+        Start the simulation of the replay and return its seed.
+        """
+        self.start_time = time.perf_counter()
+        return self.seed
+
+    def get_inputs(self, step):
+        """
+        Return the movement on both axes and the number of interactions of a
+        step of the game.
+        """
+        while self.counter_record < len(self.list_records) and \
+                self.list_records[self.counter_record][0] <= step:
+            self.inputs = self.list_records[self.counter_record][1]
+            self.counter_record += 1
+        return self.inputs
+
+    def is_finished(self, step):
+        """
+        Tell whether all the steps recorded have been simulated.
+        """
+        if self.end is not None:
+            return step >= self.end[0]
+        return self.counter_record == len(self.list_records)
+
+    def finish(self, step, score):
+        """
+        Compare the end of the simulation to the end of the run recorded.
+
+        Parameters
+        ----------
+        step : int
+            Number of steps of the game simulated.
+        score : int
+            Score at the end of the simulation.
+
+        Returns
+        -------
+        dict
+            Result of the simulation, with the differences found.
+        """
+        list_differences = []
+        if self.end is None:
+            list_differences.append("the replay has no end")
+        else:
+            end_step, end_score = self.end
+            if step != end_step:
+                list_differences.append(
+                    f"ended at step {step} instead of {end_step}")
+            if score != end_score:
+                list_differences.append(
+                    f"score {score} instead of {end_score}")
+        self.result = {
+            "steps": step,
+            "score": score,
+            "simulation_time": time.perf_counter() - self.start_time,
+            "differences": list_differences
+        }
+        self.is_active = False
+        return self.result
+
+
+#################
+### Functions ###
+#################
+
+
+def encode_collection(dict_collection):
+    """
+    Return the bit mask of the precious stones found in a collection.
+    """
+    collection_mask = 0
+    for counter, stone_name in enumerate(DICT_TREASURE_STONES.values()):
+        if dict_collection[stone_name]:
+            collection_mask |= 1 << counter
+    return collection_mask
+
+
+def decode_collection(collection_mask):
+    """
+    Return the collection corresponding to a bit mask.
+    """
+    return {
+        stone_name: bool(collection_mask >> counter & 1)
+        for counter, stone_name in enumerate(DICT_TREASURE_STONES.values())}
+
+
+def write_bytes(file_path, data):
+    with open(file_path, "wb") as file:
+        file.write(data)
+
+
+def append_bytes(file_path, data):
+    with open(file_path, "ab") as file:
+        file.write(data)
+
+
+###############
+### Process ###
+###############
+
+
+replay_recorder = ReplayRecorder(PATH_REPLAY, REPLAY_RECORDING)
+replay_player = ReplayPlayer()
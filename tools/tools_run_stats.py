@@ -0,0 +1,233 @@
+"""
+Module to store the statistics of each run of the player.
+
+The runs are appended to a binary file as records of a fixed size, after a
+header holding the number of runs and the total and the maximum of each
+statistic. Loading the file only reads its header, so the summary of all
+runs is available at once, whatever their number, and only the last runs
+are read when they are displayed.
+
+Classes
+-------
+RunStatsStore
+    Binary file of the statistics of the runs, with their summary.
+
+Variables
+---------
+run_stats : RunStatsStore
+    Single instance of the store, used by all modules.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Python imports ###
+
+import os
+import struct
+
+### Module imports ###
+
+from tools.tools_constants import (
+    PATH_RUN_STATS,
+    LIST_RUN_STATS
+)
+from tools.tools_persistence import (
+    persistence
+)
+
+
+#################
+### Constants ###
+#################
+
+
+RUN_STATS_MAGIC = b"LRST"
+RUN_STATS_VERSION = 1
+
+# Date of the run, followed by its statistics
+RECORD_STRUCT = struct.Struct(
+    "<d" + "".join(value_format for _, value_format in LIST_RUN_STATS))
+# Magic, version, size of a record and number of runs, followed by the
+# total and the maximum of each statistic
+HEADER_STRUCT = struct.Struct("<4sHHI" + "d" * 2 * len(LIST_RUN_STATS))
+
+
+###############
+### Classes ###
+###############
+
+
+class RunStatsStore():
+    """
+    Binary file of the statistics of the runs, with their summary.
+
+    The summary is kept in memory and updated with each new run. The
+    record of the run is written before the header, on the thread of the
+    persistence, so that a crash between both writes only loses this run.
+    The records of the runs of the session are also kept in memory, so that
+    only the runs written by the previous sessions are read from the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.list_names = [name for name, _ in LIST_RUN_STATS]
+        self.number_runs = 0
+        self.number_runs_loaded = 0
+        self.list_new_records = []
+        self.dict_totals = dict.fromkeys(self.list_names, 0)
+        self.dict_maxima = dict.fromkeys(self.list_names, 0)
+        self.load_header()
+
+    def load_header(self):
+        """
+        Read the summary of the runs from the header of the file, and
+        ignore the file if it is missing or in another format.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as file:
+            data = file.read(HEADER_STRUCT.size)
+        if len(data) < HEADER_STRUCT.size:
+            return
+        magic, version, record_size, number_runs, *values = \
+            HEADER_STRUCT.unpack(data)
+        if magic != RUN_STATS_MAGIC or version != RUN_STATS_VERSION or \
+                record_size != RECORD_STRUCT.size:
+            return
+        number_stats = len(self.list_names)
+        self.number_runs = number_runs
+        self.number_runs_loaded = number_runs
+        self.dict_totals = dict(zip(self.list_names, values[:number_stats]))
+        self.dict_maxima = dict(zip(self.list_names, values[number_stats:]))
+
+    def add_run(self, date, dict_stats):
+        """
+        Add the statistics of a run and save them behind the game.
+
+        Parameters
+        ----------
+        date : float
+            Time of the end of the run, in seconds since the epoch.
+        dict_stats : dict
+            Value of each statistic of LIST_RUN_STATS.
+
+        Returns
+        -------
+        None
+        """
+        list_values = [dict_stats[name] for name in self.list_names]
+        record = RECORD_STRUCT.pack(date, *list_values)
+        offset = HEADER_STRUCT.size + self.number_runs * RECORD_STRUCT.size
+
+        self.number_runs += 1
+        self.list_new_records.append(record)
+        for name, value in zip(self.list_names, list_values):
+            self.dict_totals[name] += value
+            self.dict_maxima[name] = max(self.dict_maxima[name], value)
+
+        persistence.submit(
+            write_run, self.path, offset, record, self.pack_header())
+
+    def pack_header(self):
+        return HEADER_STRUCT.pack(
+            RUN_STATS_MAGIC, RUN_STATS_VERSION, RECORD_STRUCT.size,
+            self.number_runs,
+            *[self.dict_totals[name] for name in self.list_names],
+            *[self.dict_maxima[name] for name in self.list_names])
+
+    def get_summary(self):
+        """
+        Return the summary of all runs.
+
+        Returns
+        -------
+        dict
+            Number of runs, and total, mean and maximum of each statistic.
+        """
+        dict_summary = {"number_runs": self.number_runs}
+        for name in self.list_names:
+            total = self.dict_totals[name]
+            dict_summary[name] = {
+                "total": total,
+                "mean": total / self.number_runs if self.number_runs else 0,
+                "max": self.dict_maxima[name]
+            }
+        return dict_summary
+
+    def get_last_runs(self, number_runs):
+        """
+        Return the statistics of the last runs, the most recent first,
+        without waiting for the runs of the session to be written.
+
+        Parameters
+        ----------
+        number_runs : int
+            Maximal number of runs to return.
+
+        Returns
+        -------
+        list[dict]
+            Date and statistics of each run.
+        """
+        list_records = self.list_new_records[
+            max(0, len(self.list_new_records) - number_runs):]
+        number_old_runs = min(
+            number_runs - len(list_records), self.number_runs_loaded)
+        # Only read the records of the previous sessions, which are already
+        # written, and ignore the ones missing from a truncated file
+        if number_old_runs > 0 and os.path.exists(self.path):
+            number_records = max(
+                0, os.path.getsize(self.path) - HEADER_STRUCT.size) \
+                // RECORD_STRUCT.size
+            number_records = min(number_records, self.number_runs_loaded)
+            number_old_runs = min(number_old_runs, number_records)
+            first_run = number_records - number_old_runs
+            with open(self.path, "rb") as file:
+                file.seek(HEADER_STRUCT.size + first_run * RECORD_STRUCT.size)
+                data = file.read(number_old_runs * RECORD_STRUCT.size)
+            data = data[:len(data) - len(data) % RECORD_STRUCT.size]
+            list_records = [
+                data[counter:counter + RECORD_STRUCT.size]
+                for counter in range(0, len(data), RECORD_STRUCT.size)] + \
+                list_records
+        list_runs = []
+        for date, *values in map(RECORD_STRUCT.unpack, list_records):
+            dict_run = dict(zip(self.list_names, values))
+            dict_run["date"] = date
+            list_runs.append(dict_run)
+        list_runs.reverse()
+        return list_runs
+
+
+#################
+### Functions ###
+#################
+
+
+def write_run(path, offset, record, header):
+    """
+    Write the record of a run at its place in the file, then the header
+    counting it.
+    """
+    mode = "r+b" if os.path.exists(path) else "w+b"
+    with open(path, mode) as file:
+        file.seek(offset)
+        file.write(record)
+        file.flush()
+        os.fsync(file.fileno())
+        file.seek(0)
+        file.write(header)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+###############
+### Process ###
+###############
+
+
+run_stats = RunStatsStore(PATH_RUN_STATS)
@@ -0,0 +1,156 @@
+"""
+Module dealing with the settings of the application.
+
+The settings file is read once, at the import of this module, with the
+changes of the collection and of the high score journaled since its last
+write. The settings are then only changed in memory through the store,
+which saves them behind the game and notifies the screens subscribed to
+its changes.
+
+Classes
+-------
+SettingsStore
+    Settings of the application, loaded once and dispatched when changed.
+
+MyCollection
+    Precious stones found by the player and high score.
+
+Variables
+---------
+settings : SettingsStore
+    Single instance of the settings, used by all modules.
+
+my_collection : MyCollection
+    Collection of the player, stored in the settings.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Kivy imports ###
+
+from kivy.event import EventDispatcher
+
+### Module imports ###
+
+from tools.tools_constants import (
+    PATH_SETTINGS,
+    PATH_SETTINGS_JOURNAL,
+    SETTINGS_SAVE_DELAY,
+    LIST_JOURNALED_SECTIONS,
+    JOURNAL_MAX_RECORDS,
+    DICT_TREASURE_STONES
+)
+from tools.tools_persistence import (
+    persistence
+)
+
+
+###############
+### Classes ###
+###############
+
+
+class SettingsStore(EventDispatcher):
+    """
+    Settings of the application, loaded once and dispatched when changed.
+
+    The settings are divided into sections, such as the keys or the
+    collection. The event on_change is dispatched with the section, the key
+    changed in the section (None when the whole section is replaced) and
+    the new value.
+    """
+
+    __events__ = ("on_change",)
+
+    def __init__(self, path, journal_path, save_delay, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.data = persistence.load_document(
+            path, save_delay, journal_path=journal_path,
+            max_records=JOURNAL_MAX_RECORDS)
+
+    @property
+    def keys(self):
+        """
+        Keys of the controls, referenced by their action.
+        """
+        return self.data["keys"]
+
+    def get(self, section, key=None):
+        if key is None:
+            return self.data[section]
+        return self.data[section][key]
+
+    def set(self, section, key, value):
+        """
+        Change a setting, save it later and notify the subscribers.
+
+        Parameters
+        ----------
+        section : str
+            Section of the settings.
+        key : str
+            Key in the section, None to replace the whole section.
+        value
+            New value.
+
+        Returns
+        -------
+        None
+        """
+        if key is None:
+            if self.data.get(section) == value:
+                return
+            self.data[section] = value
+        else:
+            if self.data[section].get(key) == value:
+                return
+            self.data[section][key] = value
+        # The frequent changes of the game only append a record
+        if section in LIST_JOURNALED_SECTIONS:
+            persistence.append_record(self.path, section, key, value)
+        else:
+            persistence.mark_dirty(self.path)
+        self.dispatch("on_change", section, key, value)
+
+    def on_change(self, section, key, value):
+        pass
+
+
+class MyCollection():
+    """
+    Precious stones found by the player and high score, stored in the
+    settings.
+    """
+
+    def __init__(self, settings_store) -> None:
+        self.settings = settings_store
+
+    @property
+    def dict_collection(self):
+        return self.settings.get("collection")
+
+    @property
+    def high_score(self):
+        return self.settings.get("high_score")
+
+    def find_new_stone(self, stone_name):
+        self.settings.set("collection", DICT_TREASURE_STONES[stone_name], True)
+
+    def update_high_score(self, score):
+        if self.high_score < score:
+            self.settings.set("high_score", None, score)
+
+
+###############
+### Process ###
+###############
+
+
+settings = SettingsStore(
+    PATH_SETTINGS, PATH_SETTINGS_JOURNAL, SETTINGS_SAVE_DELAY)
+my_collection = MyCollection(settings)
@@ -6,124 +6,641 @@ Module to manage musics and sound effects
 ### Imports ###
 ###############
 
-import os
+from collections import OrderedDict
+from functools import partial
+from math import exp, hypot
+import heapq
+import queue
+import threading
+import time
 
-from math import exp
-
-from kivy.core.audio import SoundLoader
+from kivy.clock import Clock
 
 from tools.tools_constants import (
-    FPS,
     SOUND_VOLUME,
     MUSIC_VOLUME,
-    PATH_SOUNDS,
-    PATH_MUSICS
+    AUDIO_THREAD,
+    SOUND_VOICES,
+    DICT_SOUND_RADII,
+    SPATIAL_AUDIO_RATE,
+    DICT_SOUND_PRIORITIES,
+    DEFAULT_SOUND_PRIORITY
+)
+from tools.tools_assets import (
+    MUSIC_DICT,
+    SOUND_DICT
 )
 
 ###############
 ### Classes ###
 ###############
 
+class Fade():
+    """
+    Volume envelope of a sound, from its volume at the start to zero.
+    """
+
+    def __init__(self, key, duration, mode, start_volume, set_volume,
+                 on_end):
+        self.key = key
+        self.start_time = time.perf_counter()
+        self.end_time = self.start_time + duration
+        self.mode = mode
+        self.start_volume = start_volume
+        self.set_volume = set_volume
+        self.on_end = on_end
+
+    def get_volume(self, current_time):
+        progress = (current_time - self.start_time) / \
+            (self.end_time - self.start_time)
+        return compute_envelope(self.mode, progress) * self.start_volume
+
+
+class FadeScheduler():
+    """
+    Scheduler of the fades of the sounds, following the elapsed time so
+    that they do not depend on the frame rate.
+
+    The fades are updated by a clock event scheduled only while one of them
+    is active, and end in the order of a heap sorted by their end time.
+    """
+
+    def __init__(self):
+        self.dict_fades = {}
+        self.heap_fades = []
+        self.counter = 0
+        self.update_event = None
+
+    def is_fading(self, key):
+        return key in self.dict_fades
+
+    def fade_out(self, key, duration, start_volume, set_volume, on_end,
+                 mode="linear"):
+        """
+        Start the fade out of a sound, unless it is already fading.
+
+        Parameters
+        ----------
+        key : str
+            Name of the sound.
+        duration : float
+            Duration of the fade, in seconds.
+        start_volume : float
+            Volume of the sound at the start of the fade.
+        set_volume : callable
+            Function called with the new volume of the sound.
+        on_end : callable
+            Function called with the volume at the start of the fade when
+            the fade is over.
+        mode : str, optional
+            Shape of the envelope, "linear" or "exp".
+
+        Returns
+        -------
+        None
+        """
+        if key in self.dict_fades:
+            return
+        fade = Fade(key, duration, mode, start_volume, set_volume, on_end)
+        self.dict_fades[key] = fade
+        # The counter keeps the order of the fades ending at the same time
+        self.counter += 1
+        heapq.heappush(self.heap_fades, (fade.end_time, self.counter, fade))
+        if self.update_event is None:
+            self.update_event = Clock.schedule_interval(self.update, 0)
+
+    def cancel(self, key):
+        """
+        Stop the fade of a sound and return its volume at the start, None
+        if it was not fading.
+        """
+        fade = self.dict_fades.pop(key, None)
+        if not self.dict_fades:
+            self.stop_updates()
+        if fade is None:
+            return None
+        return fade.start_volume
+
+    def stop_updates(self):
+        self.heap_fades = []
+        if self.update_event is not None:
+            self.update_event.cancel()
+            self.update_event = None
+
+    def update(self, *args):
+        current_time = time.perf_counter()
+
+        # End the fades whose time is over, ignoring the cancelled ones
+        while self.heap_fades and self.heap_fades[0][0] <= current_time:
+            fade = heapq.heappop(self.heap_fades)[2]
+            if self.dict_fades.get(fade.key) is fade:
+                del self.dict_fades[fade.key]
+                fade.on_end(fade.start_volume)
+
+        for fade in list(self.dict_fades.values()):
+            fade.set_volume(fade.get_volume(current_time))
+
+        if not self.dict_fades:
+            self.stop_updates()
+
+
+class AudioWorker():
+    """
+    Worker running the calls to the audio backend on a dedicated thread, in
+    the order they are submitted, so that the frame loop never waits for
+    the backend.
+
+    The mixers keep the state of their sounds on the main thread and only
+    submit to the worker the calls changing the sounds, so that the state
+    is read without lock.
+    """
+
+    def __init__(self, is_threaded=AUDIO_THREAD):
+        self.is_threaded = is_threaded
+        self.queue_commands = queue.SimpleQueue()
+        self.thread = None
+
+    def submit(self, function, *args):
+        """
+        Call a function with its arguments on the audio thread.
+        """
+        if not self.is_threaded:
+            self.run_command(function, args)
+            return
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self.run, name="audio", daemon=True)
+            self.thread.start()
+        self.queue_commands.put((function, args))
+
+    def run(self):
+        while True:
+            function, args = self.queue_commands.get()
+            self.run_command(function, args)
+
+    def run_command(self, function, args):
+        try:
+            function(*args)
+        except Exception as error:
+            # The game continues without the sound
+            print("Unable to run the audio command", function, error)
+
+    def is_in_worker(self):
+        """
+        Tell if the caller is running on the audio thread.
+        """
+        return self.is_threaded and threading.current_thread() is self.thread
+
+
 class MusicMixer():
     """
     Classe destinée à gérer la musique dans le jeu
     Une seule musique peut être jouée à la fois.
+
+    The registry of the musics is only used on the main thread, where the
+    mixer keeps the names of the musics playing and their volume, and the
+    musics are played and stopped on the audio thread.
     """
 
-    def __init__(self, dict_music):
+    def __init__(self, dict_music, worker, is_streaming=False,
+                 volume=MUSIC_VOLUME):
         self.musics = dict_music
+        self.worker = worker
+        # Release the streamed musics which are not played anymore
+        self.is_streaming = is_streaming
+        self.volume = volume
+        self.set_playing_names = set()
+        self.dict_volumes = {}
+
+    def is_playing(self, name):
+        """
+        Tell if a music is playing, without loading it.
+        """
+        return name in self.set_playing_names
+
+    def get_volume(self, name):
+        return self.dict_volumes.get(name, self.volume)
+
+    def get_loaded_musics(self):
+        # Only the musics already loaded can be playing
+        return [music for _, music in self.musics.loaded_items()]
+
+    def release(self, name_to_keep):
+        """
+        Forget the musics not playing, except the one given, and return them
+        to unload them on the audio thread.
+        """
+        list_released = []
+        for key, music in self.musics.loaded_items():
+            if key != name_to_keep and key not in self.set_playing_names:
+                self.musics.unload(key)
+                list_released.append(music)
+        return list_released
 
     def change_volume(self, name, new_volume):
-        self.musics[name].volume = new_volume
+        self.dict_volumes[name] = new_volume
+        # The volume of the other musics is set when they are played
+        if self.musics.is_loaded(name):
+            self.worker.submit(
+                self.set_music_volume, self.musics[name], new_volume)
+
+    def set_music_volume(self, music, volume):
+        music.volume = volume
 
     def play(self, name, loop=False, timecode=0, stop_other_sounds=True):
+        list_stopped = []
         if stop_other_sounds:
-            self.stop()
-        self.musics[name].play()
+            self.set_playing_names.clear()
+            list_stopped = self.get_loaded_musics()
+        self.set_playing_names.add(name)
+        list_released = self.release(name) if self.is_streaming else []
+        # A streamed music is only opened, which is fast enough for a frame
+        self.worker.submit(
+            self.play_music, self.musics[name], self.get_volume(name), loop,
+            timecode, list_stopped, list_released)
+
+    def play_music(self, music, volume, loop, timecode, list_stopped,
+                   list_released):
+        """
+        Play a music on the audio thread, after stopping the other musics
+        and unloading the ones released.
+        """
+        self.stop_musics(list_stopped)
+        for released_music in list_released:
+            released_music.unload()
+        music.volume = volume
+        music.play()
         if timecode != 0:
             # Ne marche pas
-            self.musics[name].seek(1)
-        self.musics[name].loop = loop
+            music.seek(1)
+        music.loop = loop
 
     def stop(self):
-        for key in self.musics:
-            if self.musics[key].state == "play":
-                self.musics[key].stop()
+        self.set_playing_names.clear()
+        self.worker.submit(self.stop_musics, self.get_loaded_musics())
+
+    def stop_musics(self, list_musics):
+        for music in list_musics:
+            if music.state == "play":
+                music.stop()
 
 class DynamicMusicMixer(MusicMixer):
     """
     Classe destinée à jouer des bruitages sur lesquels on peut appliquer des effets en jeu.
     """
 
-    def __init__(self, dict_music):
-        super().__init__(dict_music)
-        self.instructions = []
-        dico_frame_state = {}
-        for key in dict_music:
-            dico_frame_state[key] = 0
-        self.dico_frame_state = dico_frame_state
+    def __init__(self, dict_music, worker, is_streaming=False,
+                 volume=MUSIC_VOLUME):
+        super().__init__(
+            dict_music, worker, is_streaming=is_streaming, volume=volume)
+        self.fades = FadeScheduler()
+
+    def play(self, name, loop=False, timecode=0, stop_other_sounds=True):
+        # Bring back the volume of a music played again while fading
+        start_volume = self.fades.cancel(name)
+        if start_volume is not None:
+            self.change_volume(name, start_volume)
+        super().play(name, loop=loop, timecode=timecode,
+                     stop_other_sounds=stop_other_sounds)
 
     def fade_out(self, name, duration, mode="linear"):
-        if mode == "exp":
-            self.instructions.append(("exp_fade_out", name, duration))
-        else:
-            self.instructions.append(("fade_out", name, duration))
-
-    def recursive_update(self):
-        pop_list = []
-        # Parcours des instructions à effectuer
-        for instruction in self.instructions:
-            new_volume = None
-            # Calcul de l'instruction
-            if instruction[0] == "fade_out":
-                key, duration = instruction[1], instruction[2]
-                volume = self.musics[key].volume
-                frame_to_fade = FPS * duration
-                fade_diff = SOUND_VOLUME / frame_to_fade
-                new_volume = volume - fade_diff
-            elif instruction[0] == "exp_fade_out":
-                key, duration = instruction[1], instruction[2]
-                frame_to_fade = FPS * duration
-                t = 60 * self.dico_frame_state[key] / frame_to_fade
-                self.dico_frame_state[key] += 1
-                new_volume = exp_fade_out(t) * SOUND_VOLUME
-            # Application du changement de volume
-            if new_volume is not None:
-                if new_volume > 0:
-                    self.musics[key].volume = new_volume
-                else:
-                    self.musics[key].volume = 0
-                    self.musics[key].stop()
-                    self.musics[key].volume = SOUND_VOLUME
-                    self.dico_frame_state[key] = 0
-                    pop_list.append(instruction)
-        # Enlève les instructions terminées
-        for el in pop_list:
-            self.instructions.remove(el)
+        self.fades.fade_out(
+            name, duration, self.get_volume(name),
+            partial(self.change_volume, name),
+            partial(self.end_fade_out, name), mode=mode)
+
+    def end_fade_out(self, name, start_volume):
+        self.set_playing_names.discard(name)
+        if self.musics.is_loaded(name):
+            self.worker.submit(self.stop_music, self.musics[name])
+        self.change_volume(name, start_volume)
+
+    def stop_music(self, music):
+        music.stop()
+
+class SpatialAudio():
+    """
+    Engine setting the volume of the sounds emitted around the listener
+    from the distance of their closest source.
+
+    The sounds are played in loop while a source is in range, and faded out
+    when the last one gets out of range. The volumes are refreshed at a
+    capped rate, since they change slowly with the moves of the listener.
+    """
+
+    def __init__(self, mixer, dict_radii=DICT_SOUND_RADII,
+                 refresh_rate=SPATIAL_AUDIO_RATE):
+        self.mixer = mixer
+        self.dict_radii = dict_radii
+        self.refresh_period = 1 / refresh_rate
+        self.max_radius = max(dict_radii.values())
+        self.last_refresh_time = None
+
+    def is_refresh_due(self):
+        return self.last_refresh_time is None or \
+            time.perf_counter() - self.last_refresh_time >= self.refresh_period
+
+    def update(self, listener_position, list_sources):
+        """
+        Set the volume of each sound from its closest source.
+
+        Parameters
+        ----------
+        listener_position : tuple
+            Position of the listener on the grid, in tiles.
+        list_sources : list
+            Tiles emitting a sound near the listener, given by their grid
+            position and the name of their sound.
+
+        Returns
+        -------
+        None
+        """
+        self.last_refresh_time = time.perf_counter()
+        x_listener, y_listener = listener_position
+        dict_gains = {}
+        for (x_source, y_source), name in list_sources:
+            distance = hypot(x_source + 0.5 - x_listener,
+                             y_source + 0.5 - y_listener)
+            gain = compute_distance_gain(distance, self.dict_radii[name])
+            if gain > dict_gains.get(name, 0):
+                dict_gains[name] = gain
+
+        for name in self.dict_radii:
+            if name in dict_gains:
+                self.mixer.keep_playing(
+                    name, dict_gains[name] * self.mixer.volume)
+            elif self.mixer.is_playing(name):
+                self.mixer.fade_out(name, 1, mode="exp")
+
+    def reset(self):
+        self.last_refresh_time = None
+
+
+class Voice():
+    """
+    Voice of the sound mixer, holding a loaded sound played on it.
+    """
+
+    def __init__(self, name, is_shared):
+        self.name = name
+        # Sound loaded on the audio thread
+        self.sound = None
+        # Whether the sound is the instance kept by the registry
+        self.is_shared = is_shared
+        self.priority = DEFAULT_SOUND_PRIORITY
+        self.stop_callback = None
+
 
 class SoundMixer():
     """
-    Classe destinée à gérer les bruitages dans le jeu
-    Elle est capable de jouer plusieurs fois le même son en même temps
+    Mixer playing the sound effects on a fixed pool of voices shared by all
+    the sounds, so that a sound can be played several times at once.
+
+    A voice keeps its loaded sound once stopped, so that playing the same
+    sound again reuses it without loading it. When all the voices are used,
+    the least recently used idle voice is given to the new sound, or else
+    the oldest voice playing a sound of lower or equal priority is stolen.
+
+    The state of the voices is kept on the main thread, while their sounds
+    are loaded, played and stopped on the audio thread.
     """
 
-    def __init__(self, dict_sound, volume, sound_limit=10):
-        self.sounds = {}
-        self.sound_limit = sound_limit
-        for key in dict_sound:
-            self.sounds[key] = [SoundLoader.load(dict_sound[key])
-                                for i in range(sound_limit)]
-            for i in range(sound_limit):
-                self.sounds[key][i].volume = volume
+    def __init__(self, dict_sound, worker, number_voices=SOUND_VOICES,
+                 volume=SOUND_VOLUME, dict_priorities=DICT_SOUND_PRIORITIES):
+        """
+        Create the mixer, without loading any sound.
+
+        Parameters
+        ----------
+        dict_sound : AssetRegistry
+            Registry of the sounds.
+        worker : AudioWorker
+            Worker running the calls to the audio backend.
+        number_voices : int, optional
+            Number of sounds which can be played at the same time.
+        volume : float, optional
+            Volume of the sounds.
+        dict_priorities : dict, optional
+            Priority of each sound, DEFAULT_SOUND_PRIORITY when missing.
+
+        Returns
+        -------
+        None
+        """
+        self.sounds = dict_sound
+        self.worker = worker
+        self.number_voices = number_voices
+        self.volume = volume
+        self.dict_priorities = dict_priorities
+
+        self.number_created_voices = 0
+        # Names of the sounds whose registry instance is held by a voice
+        self.set_shared_names = set()
+
+        # Idle voices, from the least to the most recently used
+        self.idle_voices = OrderedDict()
+        self.dict_idle_voices = {}
+        # Playing voices by priority and by name, in their starting order
+        self.dict_playing_voices = {}
+        self.dict_name_voices = {}
+        # Current volume of the sounds playing, when set by their name
+        self.dict_volumes = {}
+
+        self.fades = FadeScheduler()
+
+    def is_playing(self, name):
+        """
+        Tell if a sound is played on at least one voice.
+        """
+        return bool(self.dict_name_voices.get(name))
+
+    def get_volume(self, name):
+        return self.dict_volumes.get(name, self.volume)
+
+    def create_voice(self, name):
+        """
+        Create a voice for a sound, using the instance of the registry if
+        no other voice holds it.
+        """
+        is_shared = name not in self.set_shared_names
+        if is_shared:
+            self.set_shared_names.add(name)
+        voice = Voice(name, is_shared)
+        self.number_created_voices += 1
+        # The registry is only used on the main thread
+        sound = self.sounds[name] if is_shared else None
+        self.worker.submit(self.load_voice, voice, sound)
+        return voice
+
+    def load_voice(self, voice, sound):
+        """
+        Give its sound to a voice on the audio thread, loading a copy of the
+        sound when the instance of the registry is held by another voice.
+        """
+        if sound is None:
+            sound = self.sounds.load_copy(voice.name)
+        voice.sound = sound
+        voice.stop_callback = partial(self.on_voice_stop, voice)
+        voice.sound.bind(on_stop=voice.stop_callback)
+
+    def delete_voice(self, voice):
+        """
+        Delete an idle voice and unload its sound, unless the registry
+        keeps it.
+        """
+        del self.idle_voices[voice]
+        del self.dict_idle_voices[voice.name][voice]
+        if voice.is_shared:
+            self.set_shared_names.discard(voice.name)
+        self.number_created_voices -= 1
+        self.worker.submit(self.unload_voice, voice)
+
+    def unload_voice(self, voice):
+        voice.sound.unbind(on_stop=voice.stop_callback)
+        if not voice.is_shared:
+            voice.sound.unload()
+
+    def steal_voice(self, priority):
+        """
+        Stop the oldest voice playing a sound of the lowest priority, if it
+        is not higher than the priority given.
+
+        Returns
+        -------
+        bool
+            Whether a voice has been stolen.
+        """
+        for voice_priority in sorted(self.dict_playing_voices):
+            if voice_priority > priority:
+                break
+            dict_voices = self.dict_playing_voices[voice_priority]
+            if dict_voices:
+                self.stop_voice(next(iter(dict_voices)))
+                return True
+        return False
 
-    def play(self, name):
-        i = 0
-        while i < self.sound_limit and self.sounds[name][i].state == "play":
-            i += 1
-        if i < self.sound_limit:
-            self.sounds[name][i].play()
-        else:
-            print("Unable to play the desired sound, channel saturation")
+    def acquire_voice(self, name, priority):
+        """
+        Return an idle voice holding the sound given, None if all the
+        voices play sounds of higher priority.
+        """
+        if not self.dict_idle_voices.get(name) and \
+                self.number_created_voices == self.number_voices:
+            if not self.idle_voices and not self.steal_voice(priority):
+                return None
+            # Free a voice for the sound, unless the stolen one holds it
+            if not self.dict_idle_voices.get(name):
+                self.delete_voice(next(iter(self.idle_voices)))
+
+        dict_idle = self.dict_idle_voices.get(name)
+        if not dict_idle:
+            return self.create_voice(name)
+        voice = next(iter(dict_idle))
+        del dict_idle[voice]
+        del self.idle_voices[voice]
+        return voice
+
+    def release_voice(self, voice):
+        """
+        Make a playing voice idle.
+        """
+        dict_voices = self.dict_name_voices.get(voice.name, {})
+        if voice not in dict_voices:
+            return
+        del dict_voices[voice]
+        del self.dict_playing_voices[voice.priority][voice]
+        self.idle_voices[voice] = None
+        self.dict_idle_voices.setdefault(voice.name, {})[voice] = None
+        if not dict_voices:
+            self.fades.cancel(voice.name)
+            self.dict_volumes.pop(voice.name, None)
+
+    def stop_voice(self, voice):
+        self.release_voice(voice)
+        self.worker.submit(self.stop_sound, voice)
+
+    def stop_sound(self, voice):
+        voice.sound.stop()
+
+    def on_voice_stop(self, voice, sound):
+        """
+        Make a voice idle when its sound has ended by itself.
+        """
+        # The stops requested by the mixer are already taken into account
+        if not self.worker.is_in_worker():
+            self.release_voice(voice)
+
+    def change_volume(self, name, new_volume):
+        self.dict_volumes[name] = new_volume
+        for voice in self.dict_name_voices.get(name, ()):
+            self.worker.submit(self.set_voice_volume, voice, new_volume)
+
+    def set_voice_volume(self, voice, volume):
+        voice.sound.volume = volume
+
+    def keep_playing(self, name, volume):
+        """
+        Play a sound in loop at the volume given, without starting it again
+        when it is already playing, even while fading.
+        """
+        self.fades.cancel(name)
+        if not self.is_playing(name):
+            self.play(name, loop=True)
+        self.change_volume(name, volume)
+
+    def play(self, name, loop=False, stop_other_sounds=False):
+        """
+        Play a sound on a voice of the pool.
+
+        Parameters
+        ----------
+        name : str
+            Name of the sound.
+        loop : bool, optional
+            Whether to play the sound in loop.
+        stop_other_sounds : bool, optional
+            Whether to stop the other sounds before.
+
+        Returns
+        -------
+        None
+        """
+        if stop_other_sounds:
+            self.stop()
+        # Bring back the volume of the voices of a sound played again
+        if self.fades.cancel(name) is not None:
+            self.change_volume(name, self.volume)
+        priority = self.dict_priorities.get(name, DEFAULT_SOUND_PRIORITY)
+        voice = self.acquire_voice(name, priority)
+        if voice is None:
+            return
+        voice.priority = priority
+        self.dict_playing_voices.setdefault(priority, {})[voice] = None
+        self.dict_name_voices.setdefault(name, {})[voice] = None
+        self.worker.submit(
+            self.play_voice, voice, self.get_volume(name), loop)
+
+    def play_voice(self, voice, volume, loop):
+        voice.sound.volume = volume
+        voice.sound.loop = loop
+        voice.sound.play()
+
+    def stop(self):
+        for dict_voices in list(self.dict_name_voices.values()):
+            for voice in list(dict_voices):
+                self.stop_voice(voice)
+
+    def fade_out(self, name, duration, mode="linear"):
+        if self.is_playing(name):
+            self.fades.fade_out(
+                name, duration, self.get_volume(name),
+                partial(self.change_volume, name),
+                partial(self.end_fade_out, name), mode=mode)
+
+    def end_fade_out(self, name, start_volume):
+        for voice in list(self.dict_name_voices.get(name, ())):
+            self.stop_voice(voice)
 
 #################
 ### Functions ###
@@ -133,27 +650,31 @@ def exp_fade_out(t):
     return 1 - exp((t - 60) * 0.15)
 
 
-def load_sounds(folder, volume):
-    """Fonction pour charger tous les sons d'un coup.
-    Prend en entrée un dictionnaire avec le nom de chaque son et sa position.
-    Renvoie un dictionnaire avec le nom de chaque son et le son lui-même.
+def compute_distance_gain(distance, radius):
     """
-    dico = {}
-    for file in os.listdir(folder):
-        name_file = file.split(".")[0]
-        dico[name_file] = SoundLoader.load(folder + file)
-        dico[name_file].volume = volume
-    return dico
+    Return the ratio of the volume of a sound heard at a distance of its
+    source, decreasing linearly to zero just beyond its radius.
+    """
+    return max(1 - distance / (radius + 1), 0)
+
+
+def compute_envelope(mode, progress):
+    """
+    Return the ratio of the volume of a fade out, given the ratio of its
+    duration elapsed.
+    """
+    progress = min(max(progress, 0), 1)
+    if mode == "exp":
+        return max(exp_fade_out(60 * progress), 0)
+    return 1 - progress
 
 ###############
 ### Process ###
 ###############
 
 
-# Load the dictionnaries
-MUSIC_DICT = load_sounds(PATH_MUSICS, MUSIC_VOLUME)
-SOUND_DICT = load_sounds(PATH_SOUNDS, SOUND_VOLUME)
-
-# Create the mixer
-music_mixer = DynamicMusicMixer(MUSIC_DICT)
-sound_mixer = DynamicMusicMixer(SOUND_DICT)
+# Create the mixer, the sounds are loaded on their first use
+audio_worker = AudioWorker()
+music_mixer = DynamicMusicMixer(MUSIC_DICT, audio_worker, is_streaming=True)
+sound_mixer = SoundMixer(SOUND_DICT, audio_worker)
+spatial_audio = SpatialAudio(sound_mixer)
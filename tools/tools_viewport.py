@@ -0,0 +1,104 @@
+"""
+Module to share the metrics of the window between the modules.
+
+Classes
+-------
+Viewport
+    Metrics of the window, recomputed and dispatched when it is resized.
+
+Variables
+---------
+viewport : Viewport
+    Single instance of the metrics of the window, used by all modules.
+"""
+
+
+###############
+### Imports ###
+###############
+
+
+### Kivy imports ###
+
+from kivy.event import EventDispatcher
+from kivy.core.window import Window
+
+### Module imports ###
+
+from tools.tools_constants import (
+    CASES_ON_WIDTH,
+    INC_TILE_SIZE_RATIO,
+    CHARACTER_SCALE
+)
+
+
+###############
+### Classes ###
+###############
+
+
+class Viewport(EventDispatcher):
+    """
+    Metrics of the window, recomputed once when the window is resized.
+
+    The widgets depending on the size of the window bind the event
+    on_viewport_resize to rescale themselves instead of reading their own
+    copy of the size of the window.
+    """
+
+    __events__ = ("on_viewport_resize",)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.window_size = None
+        self.compute_metrics()
+        Window.bind(on_resize=self.on_window_resize)
+
+    def compute_metrics(self):
+        """
+        Compute the metrics depending on the size of the window.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.window_size = tuple(Window.size)
+        self.screen_ratio = self.window_size[0] / self.window_size[1]
+        self.font_ratio = self.window_size[0] / 800
+
+        # Compute the size of one tile in pixel
+        self.tile_size = self.window_size[0] / CASES_ON_WIDTH
+        self.tile_size_hint = (
+            INC_TILE_SIZE_RATIO * self.tile_size / self.window_size[0],
+            INC_TILE_SIZE_RATIO * self.tile_size / self.window_size[1])
+        self.character_size = CHARACTER_SCALE * self.tile_size
+
+        # Compute the number of cases that fit in height
+        self.cases_on_height = int(CASES_ON_WIDTH / self.screen_ratio) + 1
+        self.cases_on_half_tuple = [
+            CASES_ON_WIDTH // 2 + 2,
+            self.cases_on_height // 2 + 2
+        ]
+
+    def on_window_resize(self, *args):
+        """
+        Recompute the metrics and dispatch them when the size has changed.
+        """
+        if tuple(Window.size) != self.window_size:
+            self.compute_metrics()
+            self.dispatch("on_viewport_resize")
+
+    def on_viewport_resize(self, *args):
+        pass
+
+
+###############
+### Process ###
+###############
+
+
+viewport = Viewport()
@@ -11,15 +11,16 @@ It allows to create a map based on a grid where a character can move and explore
 
 ### Python import ###
 
-from math import floor, sqrt
+from math import floor, sqrt, hypot
 import random as rd
 import math
+import time
 
 
 ### Kivy imports ###
 
+from kivy.app import App
 from kivy.clock import Clock
-from kivy.atlas import Atlas
 from kivy.uix.screenmanager import Screen
 from kivy.uix.image import Image
 from kivy.uix.relativelayout import RelativeLayout
@@ -28,9 +29,8 @@ from kivy.uix.progressbar import ProgressBar
 
 ### Module imports ###
 
+from tools.tools_profiler import profiler
 from tools.tools_constants import (
-    PATH_ATLAS,
-    PATH_IMAGES,
     DICT_TILES_TEXTURE,
     SPEED,
     CASES_ON_WIDTH,
@@ -39,6 +39,11 @@ from tools.tools_constants import (
     FRAMES_LATERAL,
     MOBILE_MODE,
     FPS,
+    SIMULATION_FPS,
+    SIMULATION_STEP,
+    TUTORIAL_STEP,
+    MAX_SIMULATION_STEPS,
+    REPLAY_FRAME_BUDGET,
     PATH_MAPS,
     DICT_TILES_MOVEMENT,
     MOVE,
@@ -51,20 +56,15 @@ from tools.tools_constants import (
     RATE_AUGMENTATION_LIGHT_DISPLAY,
     MAP_SIZE,
     GAME_OVER_FREEZE_TIME,
-    SOUND_RADIUS_CRYSTAL,
+    DICT_SOUND_SOURCES,
     START_BEACON_CASES,
     PROBABILITY_WATER_DROPS,
     MAX_TIME_IN_DARK,
     CHARACTER_MOVEMENT,
-    PATH_SETTINGS,
     DICT_TREASURE_STONES,
     RATE_DIMINUTION_LIGHT_AUGMENTATION,
     DICT_DISPLAY_ORIENTATIONS,
-    my_collection,
-    SOUND_RADIUS_BEACON,
-    Window,
-    INC_TILE_SIZE_RATIO,
-    CHARACTER_SCALE
+    Window
 )
 from tools.tools_kivy_mobile import (
     MobileJoystick,
@@ -79,36 +79,32 @@ from tools.tools_effect import (
 )
 from tools.tools_sound import (
     sound_mixer,
+    spatial_audio,
     music_mixer
 )
-from tools.tools_basis import (
-    load_json_file
+from tools.tools_viewport import (
+    viewport
+)
+from tools.tools_assets import (
+    TEXTURE_DICT
+)
+from tools.tools_persistence import (
+    persistence
+)
+from tools.tools_settings import (
+    settings,
+    my_collection
+)
+from tools.tools_run_stats import (
+    run_stats
+)
+from tools.tools_checkpoint import (
+    run_checkpoint
+)
+from tools.tools_replay import (
+    replay_recorder,
+    replay_player
 )
-
-
-def change_window_size(*args):
-    global WINDOW_SIZE, SCREEN_RATIO, TILE_SIZE, TILE_SIZE_HINT, CHARACTER_SIZE,\
-        CASES_ON_HEIGHT, CASES_ON_WIDTH, CASES_ON_HALF_HEIGHT, CASES_ON_HALF_WIDTH,\
-        CASES_ON_HALF_TUPLE
-
-    # Compute the size of one tile in pixel
-    WINDOW_SIZE = Window.size
-    SCREEN_RATIO = WINDOW_SIZE[0] / WINDOW_SIZE[1]
-    TILE_SIZE = WINDOW_SIZE[0] / CASES_ON_WIDTH
-    TILE_SIZE_HINT = (INC_TILE_SIZE_RATIO * TILE_SIZE /
-                      WINDOW_SIZE[0], INC_TILE_SIZE_RATIO * TILE_SIZE / WINDOW_SIZE[1])
-    CHARACTER_SIZE = CHARACTER_SCALE * TILE_SIZE
-
-    # Compute the number of cases that fit in height
-    CASES_ON_HEIGHT = int(CASES_ON_WIDTH / SCREEN_RATIO) + 1
-
-    CASES_ON_HALF_HEIGHT = CASES_ON_HEIGHT // 2 + 2
-    CASES_ON_HALF_WIDTH = CASES_ON_WIDTH // 2 + 2
-    CASES_ON_HALF_TUPLE = [CASES_ON_HALF_WIDTH, CASES_ON_HALF_HEIGHT]
-
-
-Window.bind(on_resize=change_window_size)
-change_window_size()
 
 
 ###############
@@ -121,6 +117,41 @@ class GridMap():
         self.tiles = {}
         self.map_size = None
         self.offset_list = []
+        # Tiles emitting a sound, referenced by their submap
+        self.dict_sound_sources = {}
+
+    def get_submap_offset(self, position):
+        return (position[0] // self.map_size[0],
+                position[1] // self.map_size[1])
+
+    def index_sound_source(self, position, tile_type):
+        """
+        Add or remove a tile from the sound sources after it has changed.
+        """
+        dict_sources = self.dict_sound_sources.setdefault(
+            self.get_submap_offset(position), {})
+        if tile_type in DICT_SOUND_SOURCES:
+            dict_sources[position] = DICT_SOUND_SOURCES[tile_type]
+        else:
+            dict_sources.pop(position, None)
+
+    def get_sound_sources(self, position, radius):
+        """
+        Return the tiles emitting a sound around a position, with the name
+        of their sound, looking only in the submaps within the radius.
+        """
+        list_sources = []
+        if self.map_size is None:
+            return list_sources
+        x_min, y_min = self.get_submap_offset(
+            (floor(position[0] - radius), floor(position[1] - radius)))
+        x_max, y_max = self.get_submap_offset(
+            (floor(position[0] + radius), floor(position[1] + radius)))
+        for x_offset in range(x_min, x_max + 1):
+            for y_offset in range(y_min, y_max + 1):
+                list_sources.extend(self.dict_sound_sources.get(
+                    (x_offset, y_offset), {}).items())
+        return list_sources
 
     def add_submap(self, grid_map_list, offset_tuple):
         if self.map_size is None:
@@ -137,8 +168,50 @@ class GridMap():
 
         for j in range(len(grid_map_list)):
             for i in range(len(grid_map_list[0])):
-                self.tiles[(i + x_offset, j + y_offset)
-                           ] = grid_map_list[len(grid_map_list) - 1 - j][i]
+                position = (i + x_offset, j + y_offset)
+                tile_type = grid_map_list[len(grid_map_list) - 1 - j][i]
+                self.tiles[position] = tile_type
+                if tile_type in DICT_SOUND_SOURCES:
+                    self.index_sound_source(position, tile_type)
+
+    def get_state(self):
+        """
+        Return the tiles of the map as json values, with the tiles of each
+        submap in a string.
+        """
+        list_offsets = list(dict.fromkeys(self.offset_list))
+        list_submaps = []
+        for x_offset, y_offset in list_offsets:
+            x_offset *= self.map_size[0]
+            y_offset *= self.map_size[1]
+            list_submaps.append(" ".join(
+                self.tiles[(i + x_offset, j + y_offset)]
+                for j in range(self.map_size[1])
+                for i in range(self.map_size[0])))
+        return {
+            "map_size": self.map_size,
+            "offset_list": self.offset_list,
+            "submaps": dict(zip(
+                [f"{x} {y}" for x, y in list_offsets], list_submaps))
+        }
+
+    def set_state(self, state):
+        """
+        Restore the tiles of the map from the values of get_state.
+        """
+        self.map_size = tuple(state["map_size"])
+        self.offset_list = [tuple(offset) for offset in state["offset_list"]]
+        self.tiles = {}
+        self.dict_sound_sources = {}
+        width, height = self.map_size
+        for key, submap in state["submaps"].items():
+            x_offset, y_offset = (int(value) for value in key.split(" "))
+            for counter, tile_type in enumerate(submap.split(" ")):
+                position = (counter % width + x_offset * width,
+                            counter // width + y_offset * height)
+                self.tiles[position] = tile_type
+                if tile_type in DICT_SOUND_SOURCES:
+                    self.index_sound_source(position, tile_type)
 
     def get_texture(self, position):
         if position not in self.tiles:
@@ -147,6 +220,7 @@ class GridMap():
 
     def replace_texture(self, position, new_texture):
         self.tiles[position] = new_texture
+        self.index_sound_source(position, new_texture)
 
     def get_tile_type(self, position):
         if position not in self.tiles:
@@ -155,6 +229,7 @@ class GridMap():
 
     def set_tile_type(self, position, value):
         self.tiles[position] = value
+        self.index_sound_source(position, value)
 
     def __str__(self) -> str:
         res = ""
@@ -178,14 +253,6 @@ class GridMap():
         return self.__str__()
 
 
-class LogoTextureWidget(Image):
-    def __init__(self, texture, **kwargs):
-        super().__init__(**kwargs)
-        self.allow_stretch = True
-        self.keep_ratio = False
-        self.texture = texture
-
-
 class TextureWidget(Image):
     """
     An image widget where the texture is direcltly set.
@@ -216,6 +283,29 @@ class WorldExplorerScreen(Screen):
     Class to define a world explorer screen
     """
 
+    # Attributes of the run saved as they are in the checkpoints
+    list_checkpoint_attributes = [
+        "beacon_x_change",
+        "beacon_y_change",
+        "character_orientation",
+        "display_orientation",
+        "score",
+        "number_crystals",
+        "crystal_1_name",
+        "crystal_2_name",
+        "beacon_life",
+        "rate_diminution_light",
+        "list_precious_stones",
+        "in_darkness_count",
+        "count_frame",
+        "number_game_steps",
+        "number_crystals_collected",
+        "number_stones_collected",
+        "number_beacons_lit",
+        "distance_walked",
+        "number_darkness_steps"
+    ]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
@@ -246,24 +336,51 @@ class WorldExplorerScreen(Screen):
         self.game_over_timer = 0
         self.in_darkness_count = 0
 
-    def init_screen(self):
+        # Time not simulated yet by the fixed steps
+        self.time_accumulator = 0
+        self.is_running = False
+
+        # Rescale the display at the next frame when the window is resized
+        self.is_viewport_dirty = False
+        viewport.bind(on_viewport_resize=self.on_viewport_resize)
+        settings.bind(on_change=self.on_settings_change)
+
+    def on_settings_change(self, store, section, key, value):
+        # Follow the new binding of the keys
+        if section == "keys":
+            self.INTERACT_KEY = store.keys[INTERACT]
+
+    def init_screen(self, checkpoint=None):
         """
         Init the screen when loaded.
 
         Parameters
         ----------
-        None
+        checkpoint : dict, optional
+            State of a run to resume, as returned by get_run_state. A new
+            run starts with the tutorial when it is None.
 
         Returns
         -------
         None
         """
 
-        self.font_ratio = Window.size[0] / 800
+        self.font_ratio = viewport.font_ratio
+
+        # Draw the random events of the run from a seed, to simulate it
+        # again from its replay
+        if replay_player.is_active:
+            seed = replay_player.start()
+        else:
+            seed = rd.getrandbits(32)
+            # A run resumed keeps the replay recorded before its checkpoint
+            if checkpoint is None:
+                replay_recorder.start(seed, my_collection.dict_collection)
+        self.random = rd.Random(seed)
 
         # Choose the possible directions for the next beacons
-        self.beacon_x_change = 1 - 2 * rd.randint(0, 1)
-        self.beacon_y_change = 1 - 2 * rd.randint(0, 1)
+        self.beacon_x_change = 1 - 2 * self.random.randint(0, 1)
+        self.beacon_y_change = 1 - 2 * self.random.randint(0, 1)
 
         self.count_frame = 0
         self.rate_diminution_light = RATE_DIMINUTION_LIGHT
@@ -271,51 +388,68 @@ class WorldExplorerScreen(Screen):
         self.is_game_over = False
         self.game_over_timer = 0
         self.in_darkness_count = 0
-        SETTINGS = load_json_file(PATH_SETTINGS)
-        self.INTERACT_KEY = SETTINGS["keys"][INTERACT]
-        self.DICT_KEYS = SETTINGS["keys"]
-
+        self.INTERACT_KEY = settings.keys[INTERACT]
+
+        # Statistics of the run
+        self.number_game_steps = 0
+        self.number_crystals_collected = 0
+        self.number_stones_collected = 0
+        self.number_beacons_lit = 0
+        self.distance_walked = 0
+        self.number_darkness_steps = 0
+        self.DICT_KEYS = settings.keys
+
+        self.build_layers()
         self.display_indicators()
 
-        # Update the positions and display according to the FPS frequency
-        Clock.schedule_interval(self.display_tutorial, 3 / FPS)
-
         # Store the map informations
-        self.build_grid_map()
+        if checkpoint is None:
+            self.build_grid_map()
 
-        # Set the default position
-        self.x_char_on_map = self.grid_map.map_size[0] / 2 + 0.5 - 1
-        self.y_char_on_map = self.grid_map.map_size[1] / 2 + 0.5
+            # Set the default position
+            self.x_char_on_map = self.grid_map.map_size[0] / 2 + 0.5 - 1
+            self.y_char_on_map = self.grid_map.map_size[1] / 2 + 0.5
+        else:
+            self.grid_map.set_state(checkpoint["grid_map"])
+            self.x_char_on_map, self.y_char_on_map = checkpoint["position"]
+        self.x_char_previous = self.x_char_on_map
+        self.y_char_previous = self.y_char_on_map
+        self.char_display_position = (self.x_char_on_map, self.y_char_on_map)
         self.update_map_on_screen_position()
         self.prec_map_center_grid_pos = self.get_map_center_grid_pos()
 
+        # Flags to update only the subsystems whose inputs have changed
+        self.is_map_dirty = True
+        self.is_darkness_dirty = True
+        self.is_viewport_dirty = False
+
         # Create the character and display it on the screen
         self.character = TextureWidget(
             name_texture="front",
-            x=self.x_char_on_screen - CHARACTER_SIZE / 2,
-            y=self.y_char_on_screen - CHARACTER_SIZE / 2,
-            size_hint=(CHARACTER_SIZE / WINDOW_SIZE[0], CHARACTER_SIZE / WINDOW_SIZE[1]))
-        self.add_widget(self.character)
+            x=self.x_char_on_screen - viewport.character_size / 2,
+            y=self.y_char_on_screen - viewport.character_size / 2,
+            size_hint=(viewport.character_size / viewport.window_size[0], viewport.character_size / viewport.window_size[1]))
+        self.character_layer.add_widget(self.character)
         self.character_state = 1
         self.crystal_1 = Image(
             texture=TEXTURE_DICT[DICT_TILES_TEXTURE["C"][0]],
             x=self.x_char_on_screen,
-            y=self.y_char_on_screen - 3 * CHARACTER_SIZE / 4,
+            y=self.y_char_on_screen - 3 * viewport.character_size / 4,
             size_hint=(None, None),
-            width=TILE_SIZE // 4,
+            width=viewport.tile_size // 4,
             keep_ratio=True,
             opacity=0)
-        self.add_widget(self.crystal_1)
+        self.character_layer.add_widget(self.crystal_1)
         self.crystal_1_name = ""
         self.crystal_2 = Image(
             texture=TEXTURE_DICT[DICT_TILES_TEXTURE["C"][0]],
-            x=self.x_char_on_screen - CHARACTER_SIZE // 2,
-            y=self.y_char_on_screen - 4 * CHARACTER_SIZE / 5,
+            x=self.x_char_on_screen - viewport.character_size // 2,
+            y=self.y_char_on_screen - 4 * viewport.character_size / 5,
             size_hint=(None, None),
-            width=TILE_SIZE // 4,
+            width=viewport.tile_size // 4,
             keep_ratio=True,
             opacity=0)
-        self.add_widget(self.crystal_2)
+        self.character_layer.add_widget(self.crystal_2)
         self.crystal_2_name = ""
 
         # Create the textures for the map
@@ -326,11 +460,11 @@ class WorldExplorerScreen(Screen):
                 self.add_texture_to_map((x, y))
 
         self.darkness_circle = CircleDarkness(
-            3, x=WINDOW_SIZE[0] / 2, y=WINDOW_SIZE[1] / 2)
-        self.add_widget(self.darkness_circle, 0)
+            3, x=viewport.window_size[0] / 2, y=viewport.window_size[1] / 2)
+        self.darkness_layer.add_widget(self.darkness_circle)
 
         self.ambient_darkness = AmbientDarkness()
-        self.add_widget(self.ambient_darkness)
+        self.darkness_layer.add_widget(self.ambient_darkness)
 
         self.beacon_position = (MAP_SIZE // 2, MAP_SIZE // 2 - 0.5)
         self.list_keydown = []
@@ -341,7 +475,105 @@ class WorldExplorerScreen(Screen):
 
         self.beacon_map_history = [(0, 0)]
 
-        self.is_beacon_near = False
+        # Start the tutorial, then the game, simulated with fixed steps
+        self.is_tutorial = True
+        if checkpoint is not None:
+            self.restore_run_state(checkpoint)
+        self.time_accumulator = 0
+        self.is_running = True
+        Clock.schedule_interval(self.update, 1 / FPS)
+
+    def get_run_state(self):
+        """
+        Return the state of the run, to resume it later, or None if the run
+        cannot be resumed.
+
+        Only the state of the simulation is saved, the display being
+        rebuilt from it.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            State of the run, containing only json values.
+        """
+        if not self.is_running or self.is_tutorial or self.is_game_over:
+            return None
+        state = {
+            name: getattr(self, name)
+            for name in self.list_checkpoint_attributes}
+        state["position"] = (self.x_char_on_map, self.y_char_on_map)
+        state["beacon_position"] = self.beacon_position
+        state["beacon_map_history"] = self.beacon_map_history
+        state["darkness_radius"] = self.darkness_circle.radius
+        state["grid_map"] = self.grid_map.get_state()
+        return state
+
+    def restore_run_state(self, state):
+        """
+        Resume a run from its state, once the map and the character are
+        displayed, skipping the tutorial.
+
+        Parameters
+        ----------
+        state : dict
+            State of the run, as returned by get_run_state.
+
+        Returns
+        -------
+        None
+        """
+        for name in self.list_checkpoint_attributes:
+            setattr(self, name, state[name])
+        self.beacon_position = tuple(state["beacon_position"])
+        self.beacon_map_history = [
+            tuple(offset) for offset in state["beacon_map_history"]]
+        self.darkness_circle.change_radius(state["darkness_radius"])
+
+        # Display the state restored
+        self.update_facing_character()
+        self.update_number_crystals_label()
+        self.update_progress_bar_beacon()
+        for counter, crystal in enumerate((self.crystal_1, self.crystal_2)):
+            if counter < self.number_crystals[0]:
+                crystal_name = (self.crystal_1_name, self.crystal_2_name)[counter]
+                if crystal_name in DICT_TREASURE_STONES:
+                    crystal.texture = TEXTURE_DICT[
+                        DICT_TREASURE_STONES[crystal_name]]
+                crystal.opacity = 1
+
+        self.is_tutorial = False
+        self.create_controls()
+
+        # The checkpoint is only used once
+        run_checkpoint.clear()
+
+    def build_layers(self):
+        """
+        Create the layers of the screen, from the bottom to the top.
+
+        The order of the layers sets the order of display, so the widgets
+        never need to be moved in the widget tree to stay on top.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.map_layer = RelativeLayout()
+        self.character_layer = RelativeLayout()
+        self.darkness_layer = RelativeLayout()
+        self.hud_layer = RelativeLayout()
+        self.add_widget(self.map_layer)
+        self.add_widget(self.character_layer)
+        self.add_widget(self.darkness_layer)
+        self.add_widget(self.hud_layer)
 
     def display_indicators(self):
         # Add a FPS counter for the debug mode
@@ -351,7 +583,7 @@ class WorldExplorerScreen(Screen):
                 pos_hint={"x": 0, "y": 0},
                 size_hint=(0.05, 0.05),
                 font_size=10 * self.font_ratio)
-            self.add_widget(self.fps_label)
+            self.hud_layer.add_widget(self.fps_label)
 
         # Label for the number of crystals
         pos_hint = {"right": 0.95, "y": 0}
@@ -360,11 +592,11 @@ class WorldExplorerScreen(Screen):
         self.number_crystals_label = Label(
             text="0 / " + str(MAX_CRYSTALS),
             pos_hint=pos_hint,
-            size_hint=(0.075, 0.05 * SCREEN_RATIO),
+            size_hint=(0.075, 0.05 * viewport.screen_ratio),
             bold=True,
             font_size=10 * self.font_ratio
         )
-        self.add_widget(self.number_crystals_label)
+        self.hud_layer.add_widget(self.number_crystals_label)
 
         # Image for the number of crystals
         pos_hint = {"right": 0.98, "y": 0.01}
@@ -374,10 +606,10 @@ class WorldExplorerScreen(Screen):
             texture=TEXTURE_DICT[DICT_TILES_TEXTURE["C"][0]],
             pos_hint=pos_hint,
             size_hint=(None, None),
-            width=0.03 * WINDOW_SIZE[0]
+            width=0.03 * viewport.window_size[0]
         )
         self.number_crystals_image.height = self.number_crystals_image.width
-        self.add_widget(self.number_crystals_image)
+        self.hud_layer.add_widget(self.number_crystals_image)
 
         # Progress bar of the life of the beacon
         self.progress_bar_beacon = ProgressBar(
@@ -386,40 +618,44 @@ class WorldExplorerScreen(Screen):
             pos_hint={"x": 0.025, "top": 1},
             size_hint=(0.95, 0.05)
         )
-        self.add_widget(self.progress_bar_beacon)
+        self.hud_layer.add_widget(self.progress_bar_beacon)
 
     def build_grid_map(self):
 
-        x_or_y_direction = rd.randint(0, 1)
+        x_or_y_direction = self.random.randint(0, 1)
 
         beacon_direction = (x_or_y_direction * self.beacon_x_change,
                             (1 - x_or_y_direction) * self.beacon_y_change)
 
         # Add the map in the center
         center_map, self.list_precious_stones = create_new_map(
-            list_precious_stones=[], has_beacon=True)
+            list_precious_stones=[], has_beacon=True,
+            random_generator=self.random)
         self.grid_map.add_submap(center_map, (0, 0))
 
         # Add the map with the other beacon
         for position in [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)]:
             if position == beacon_direction:
                 new_map, self.list_precious_stones = create_new_map(
-                    list_precious_stones=self.list_precious_stones, has_beacon=True)
+                    list_precious_stones=self.list_precious_stones, has_beacon=True,
+                    random_generator=self.random)
                 self.grid_map.add_submap(new_map, position)
             else:
                 new_map, self.list_precious_stones = create_new_map(
-                    list_precious_stones=self.list_precious_stones, has_beacon=False)
+                    list_precious_stones=self.list_precious_stones, has_beacon=False,
+                    random_generator=self.random)
                 self.grid_map.add_submap(new_map, position)
 
     def expand_grid_map(self):
-        # Scan maps around
-        grid_offset = (self.prec_map_center_grid_pos[0] // MAP_SIZE,
-                       self.prec_map_center_grid_pos[1] // MAP_SIZE)
+        # Scan maps around the character, which does not depend on the display
+        char_grid_pos = self.get_char_grid_pos()
+        grid_offset = (char_grid_pos[0] // MAP_SIZE,
+                       char_grid_pos[1] // MAP_SIZE)
 
         if grid_offset == (0, 0):
             return
 
-        x_or_y_direction = rd.randint(0, 1)
+        x_or_y_direction = self.random.randint(0, 1)
 
         beacon_direction = (x_or_y_direction * self.beacon_x_change,
                             (1 - x_or_y_direction) * self.beacon_y_change)
@@ -434,16 +670,17 @@ class WorldExplorerScreen(Screen):
                 if (i, j) != (0, 0) and offset not in self.beacon_map_history:
                     new_map, self.list_precious_stones = create_new_map(
                         list_precious_stones=self.list_precious_stones,
-                        has_beacon=has_beacon)
+                        has_beacon=has_beacon,
+                        random_generator=self.random)
                     self.grid_map.add_submap(new_map, offset)
 
         self.beacon_map_history.append(map_with_beacon_offset)
 
     def compute_min_max_display_values(self, direction_id):
         min_value = self.prec_map_center_grid_pos[direction_id] - \
-            CASES_ON_HALF_TUPLE[direction_id]
+            viewport.cases_on_half_tuple[direction_id]
         max_value = self.prec_map_center_grid_pos[direction_id] + \
-            CASES_ON_HALF_TUPLE[direction_id]
+            viewport.cases_on_half_tuple[direction_id]
         return min_value, max_value
 
     def update_map_on_screen_position(self):
@@ -458,34 +695,37 @@ class WorldExplorerScreen(Screen):
         -------
         None
         """
-        self.x_map_on_screen = self.x_char_on_map * \
-            TILE_SIZE - WINDOW_SIZE[0] / 2
-        self.y_map_on_screen = self.y_char_on_map * \
-            TILE_SIZE - WINDOW_SIZE[1] / 2
+        x_char_display, y_char_display = self.char_display_position
+        self.x_map_on_screen = x_char_display * \
+            viewport.tile_size - viewport.window_size[0] / 2
+        self.y_map_on_screen = y_char_display * \
+            viewport.tile_size - viewport.window_size[1] / 2
 
-    def update_char_on_screen_position(self):
+    def update_char_on_screen_position(self, alpha=0.0):
         """
         Update the position of the character on the screen.
 
         Parameters
         ----------
-        None
+        alpha: float
+            Progression between the last simulation step and the next one
 
         Returns
         -------
         None
         """
         # Movements of the character
-        offset = CHARACTER_MOVEMENT * math.sin(self.count_frame * 0.15)
+        offset = CHARACTER_MOVEMENT * math.sin(
+            (self.count_frame + alpha) * 0.15)
 
-        self.crystal_1.x = self.x_char_on_screen - CHARACTER_SIZE // 2 + 0.5 * offset
-        self.crystal_1.y = self.y_char_on_screen - 3 * CHARACTER_SIZE / 4 + 0.5 * offset
+        self.crystal_1.x = self.x_char_on_screen - viewport.character_size // 2 + 0.5 * offset
+        self.crystal_1.y = self.y_char_on_screen - 3 * viewport.character_size / 4 + 0.5 * offset
         self.crystal_2.x = self.x_char_on_screen + 0.5 * offset
-        self.crystal_2.y = self.y_char_on_screen - 4 * CHARACTER_SIZE / 5 - 0.5 * offset
-        self.x_char_on_screen = WINDOW_SIZE[0] / 2
-        self.y_char_on_screen = WINDOW_SIZE[1] / 2 + offset
-        self.character.x = self.x_char_on_screen - CHARACTER_SIZE / 2
-        self.character.y = self.y_char_on_screen - CHARACTER_SIZE / 2
+        self.crystal_2.y = self.y_char_on_screen - 4 * viewport.character_size / 5 - 0.5 * offset
+        self.x_char_on_screen = viewport.window_size[0] / 2
+        self.y_char_on_screen = viewport.window_size[1] / 2 + offset
+        self.character.x = self.x_char_on_screen - viewport.character_size / 2
+        self.character.y = self.y_char_on_screen - viewport.character_size / 2
 
     def get_char_grid_pos(self) -> tuple:
         """
@@ -497,8 +737,8 @@ class WorldExplorerScreen(Screen):
         """
         Return the grid coordinates of the center of the map.
         """
-        return (floor(self.x_map_on_screen / TILE_SIZE + CASES_ON_WIDTH / 2),
-                floor(self.y_map_on_screen / TILE_SIZE + CASES_ON_HEIGHT / 2))
+        return (floor(self.x_map_on_screen / viewport.tile_size + CASES_ON_WIDTH / 2),
+                floor(self.y_map_on_screen / viewport.tile_size + viewport.cases_on_height / 2))
 
     def update_textures_map_list(self, forced_reload=False) -> None:
         """
@@ -534,8 +774,7 @@ class WorldExplorerScreen(Screen):
             # Delete useless tiles
             for texture_map in self.textures_map_list[:]:
                 if texture_map.position in to_delete_list:
-                    self.textures_map_list.remove(texture_map)
-                    self.remove_widget(texture_map)
+                    self.remove_texture_from_map(texture_map)
 
             # Add necessary tiles
             textures_map_position_list = [
@@ -554,21 +793,36 @@ class WorldExplorerScreen(Screen):
         new_texture_map = TextureWidget(
             name_texture=letter_tile,
             position=position_to_add,
-            size_hint=TILE_SIZE_HINT)
+            size_hint=self.get_tile_size_hint(letter_tile))
         self.textures_map_list.append(new_texture_map)
-        self.add_widget(new_texture_map, 100)
-
-        if letter_tile in DICT_TREASURE_STONES or letter_tile == "C":
-            new_texture_map.size_hint = (
-                TILE_SIZE_HINT[0] / 2, TILE_SIZE_HINT[1] / 2)
+        self.map_layer.add_widget(new_texture_map)
 
         if letter_tile != "G":
             ground_texture = TextureWidget(
                 position=position_to_add,
-                size_hint=TILE_SIZE_HINT,
+                size_hint=viewport.tile_size_hint,
                 name_texture="G")
             self.textures_map_list.append(ground_texture)
-            self.add_widget(ground_texture, 110)
+            # The ground is always displayed below the other textures
+            self.map_layer.add_widget(
+                ground_texture, len(self.map_layer.children))
+
+    def get_tile_size_hint(self, letter_tile):
+        """
+        Return the size hint of a texture of the map, the crystals and the
+        precious stones being displayed smaller than the tiles.
+        """
+        if letter_tile in DICT_TREASURE_STONES or letter_tile == "C":
+            return (viewport.tile_size_hint[0] / 2,
+                    viewport.tile_size_hint[1] / 2)
+        return viewport.tile_size_hint
+
+    def remove_texture_from_map(self, texture_map):
+        """
+        Remove a texture from the list of textures to display.
+        """
+        self.textures_map_list.remove(texture_map)
+        self.map_layer.remove_widget(texture_map)
 
     def update_textures_map_positions(self):
         """
@@ -577,13 +831,13 @@ class WorldExplorerScreen(Screen):
         texture_map: TextureWidget
         for texture_map in self.textures_map_list:
             x_grid, y_grid = texture_map.position
-            texture_map.x = x_grid * TILE_SIZE - \
+            texture_map.x = x_grid * viewport.tile_size - \
                 self.x_map_on_screen
-            texture_map.y = y_grid * TILE_SIZE - \
+            texture_map.y = y_grid * viewport.tile_size - \
                 self.y_map_on_screen
             if texture_map.name_texture in DICT_TREASURE_STONES or texture_map.name_texture == "C":
-                texture_map.x += TILE_SIZE / 4
-                texture_map.y += TILE_SIZE / 4
+                texture_map.x += viewport.tile_size / 4
+                texture_map.y += viewport.tile_size / 4
 
     def update_textures_map_on_screen(self):
         """
@@ -625,10 +879,10 @@ class WorldExplorerScreen(Screen):
 
     def update_darkness_position(self):
         x_grid, y_grid = self.beacon_position
-        self.darkness_circle.x = x_grid * TILE_SIZE - \
-            self.x_map_on_screen + TILE_SIZE / 2
-        self.darkness_circle.y = y_grid * TILE_SIZE - \
-            self.y_map_on_screen - TILE_SIZE / 2
+        self.darkness_circle.x = x_grid * viewport.tile_size - \
+            self.x_map_on_screen + viewport.tile_size / 2
+        self.darkness_circle.y = y_grid * viewport.tile_size - \
+            self.y_map_on_screen - viewport.tile_size / 2
         self.darkness_circle.draw()
 
     def update_char_on_map_position(self, x_movement: float, y_movement: float):
@@ -647,8 +901,11 @@ class WorldExplorerScreen(Screen):
 
         Returns
         -------
-        None
+        has_moved: bool
+            Whether the character has moved on the map
         """
+        x_char_before, y_char_before = self.x_char_on_map, self.y_char_on_map
+
         # Update the orientation of the character on the map
         if abs(x_movement) > abs(y_movement):
             if x_movement > 0:
@@ -690,41 +947,22 @@ class WorldExplorerScreen(Screen):
             self.x_char_on_map += SPEED * x_movement
         elif MOVE in next_y:
             self.y_char_on_map += SPEED * y_movement
-        self.update_textures_map_on_screen()
-
-    def search_near_crystal(self, current_grid_pos):
-        x_grid, y_grid = current_grid_pos
-        has_near_crystal = False
-        for i in range(x_grid - SOUND_RADIUS_CRYSTAL, x_grid + SOUND_RADIUS_CRYSTAL + 1):
-            for j in range(y_grid - SOUND_RADIUS_CRYSTAL, y_grid + SOUND_RADIUS_CRYSTAL + 1):
-                if self.grid_map.get_tile_type((i, j)) == "C":
-                    has_near_crystal = True
-        return has_near_crystal
-
-    def search_near_off_beacon(self, current_grid_pos):
-        x_grid, y_grid = current_grid_pos
-        has_near_beacon = False
-        for i in range(x_grid - SOUND_RADIUS_BEACON, x_grid + SOUND_RADIUS_BEACON + 1):
-            for j in range(y_grid - SOUND_RADIUS_BEACON, y_grid + SOUND_RADIUS_BEACON + 1):
-                if self.grid_map.get_tile_type((i, j)) == "B":
-                    has_near_beacon = True
-        return has_near_beacon
-
-    def manage_near_beacon_sound(self):
-        if self.is_beacon_near:
-            if sound_mixer.musics["near_beacon"].state != "play":
-                sound_mixer.play("near_beacon", stop_other_sounds=False)
-        else:
-            if sound_mixer.musics["near_beacon"].state == "play":
-                sound_mixer.fade_out("near_beacon", 1, mode="exp")
 
-    def manage_near_crystal_sound(self):
-        if self.is_crystal_near:
-            if sound_mixer.musics["near_crystal"].state != "play":
-                sound_mixer.play("near_crystal", stop_other_sounds=False)
-        else:
-            if sound_mixer.musics["near_crystal"].state == "play":
-                sound_mixer.fade_out("near_crystal", 1, mode="exp")
+        return (self.x_char_on_map, self.y_char_on_map) != (
+            x_char_before, y_char_before)
+
+    def update_near_sounds(self):
+        """
+        Update the volume of the sounds of the elements near the character,
+        at the rate allowed by the spatial audio.
+        """
+        if self.is_game_over or not spatial_audio.is_refresh_due():
+            return
+        character_position = (self.x_char_on_map, self.y_char_on_map)
+        spatial_audio.update(
+            character_position,
+            self.grid_map.get_sound_sources(
+                character_position, spatial_audio.max_radius + 1))
 
     def compute_distance_with_beacon(self):
         distance = sqrt(
@@ -733,18 +971,51 @@ class WorldExplorerScreen(Screen):
 
     def clean(self):
         Clock.unschedule(self.update)
+        self.is_running = False
+        spatial_audio.reset()
         self.darkness_circle.canvas.clear()
         self.grid_map = GridMap()
         self.ambient_darkness.canvas.clear()
 
+    def get_run_stats(self):
+        """
+        Return the statistics of the run, as saved in the run statistics.
+        """
+        return {
+            "score": self.score,
+            "duration": self.number_game_steps * SIMULATION_STEP,
+            "crystals_collected": self.number_crystals_collected,
+            "stones_collected": self.number_stones_collected,
+            "beacons_lit": self.number_beacons_lit,
+            "distance_walked": self.distance_walked,
+            "time_in_darkness": self.number_darkness_steps * SIMULATION_STEP,
+            "chunks_generated": len(self.grid_map.offset_list)
+        }
+
     def game_over(self):
+        if replay_player.is_active:
+            self.finish_replay()
+            return
+        if self.game_over_timer == 0:
+            replay_recorder.finish(self.number_game_steps, self.score)
         self.game_over_timer += 1
-        if self.game_over_timer > GAME_OVER_FREEZE_TIME * FPS:
+        if self.game_over_timer > GAME_OVER_FREEZE_TIME * SIMULATION_FPS:
             my_collection.update_high_score(self.score)
+            run_stats.add_run(time.time(), self.get_run_stats())
+            persistence.flush()
             self.manager.init_screen("game_over", self.score)
             self.clean()
             self.clear_widgets()
 
+    def finish_replay(self):
+        """
+        Compare the end of the replay simulated to the run recorded and stop
+        the application.
+        """
+        replay_player.finish(self.number_game_steps, self.score)
+        self.clean()
+        App.get_running_app().stop()
+
     def manage_in_darkness(self):
         distance_with_beacon = self.compute_distance_with_beacon()
         if distance_with_beacon > self.darkness_circle.radius:
@@ -754,7 +1025,8 @@ class WorldExplorerScreen(Screen):
                     "darkness", stop_other_sounds=False, loop=False)
             if self.in_darkness:
                 self.in_darkness_count += 1
-            if self.in_darkness_count > MAX_TIME_IN_DARK * FPS:
+                self.number_darkness_steps += 1
+            if self.in_darkness_count > MAX_TIME_IN_DARK * SIMULATION_FPS:
                 sound_mixer.play("death", stop_other_sounds=True)
                 self.darkness_circle.change_radius(0)
                 self.update_darkness_position()
@@ -762,7 +1034,7 @@ class WorldExplorerScreen(Screen):
                 music_mixer.stop()
 
         else:
-            if sound_mixer.musics["darkness"].state == "play":
+            if sound_mixer.is_playing("darkness"):
                 sound_mixer.fade_out("darkness", 1, mode="exp")
             self.in_darkness = False
             self.in_darkness_count = 0
@@ -839,10 +1111,10 @@ class WorldExplorerScreen(Screen):
                     if self.number_crystals[0] < MAX_CRYSTALS:
                         self.number_crystals[0] += 1
                         self.number_crystals[1] += 1
+                        self.number_crystals_collected += 1
                         sound_mixer.play(
                             "get_crystal", stop_other_sounds=False)
-                        self.number_crystals_label.text = str(
-                            self.number_crystals[0]) + " / " + str(MAX_CRYSTALS)
+                        self.update_number_crystals_label()
 
                         self.grid_map.replace_texture(position, "G")
 
@@ -850,8 +1122,7 @@ class WorldExplorerScreen(Screen):
                         for texture in self.textures_map_list:
                             if texture.position == position and (
                                     texture.name_texture == "C"):
-                                self.remove_widget(texture)
-                                self.textures_map_list.remove(texture)
+                                self.remove_texture_from_map(texture)
                                 break
 
                         if self.number_crystals[0] == 1:
@@ -878,8 +1149,7 @@ class WorldExplorerScreen(Screen):
                         # Reset the counter of crystals
                         self.number_crystals[0] = 0
                         self.number_crystals[1] = 0
-                        self.number_crystals_label.text = "0 / " + \
-                            str(MAX_CRYSTALS)
+                        self.update_number_crystals_label()
 
                         # Update the collection if needed
                         if self.crystal_1_name not in ["C", ""]:
@@ -897,18 +1167,17 @@ class WorldExplorerScreen(Screen):
                 elif my_tile in DICT_TREASURE_STONES:
                     if self.number_crystals[0] < MAX_CRYSTALS:
                         self.number_crystals[0] += 1
+                        self.number_stones_collected += 1
                         sound_mixer.play(
                             "get_crystal", stop_other_sounds=False)
-                        self.number_crystals_label.text = str(
-                            self.number_crystals[0]) + " / " + str(MAX_CRYSTALS)
+                        self.update_number_crystals_label()
                         self.grid_map.replace_texture(position, "G")
 
                         # Delete the former textures
                         for texture in self.textures_map_list:
                             if texture.position == position and (
                                     texture.name_texture == my_tile):
-                                self.remove_widget(texture)
-                                self.textures_map_list.remove(texture)
+                                self.remove_texture_from_map(texture)
                                 break
 
                         if self.number_crystals[0] == 1:
@@ -927,6 +1196,7 @@ class WorldExplorerScreen(Screen):
     def start_new_beacon(self):
 
         self.score += 5
+        self.number_beacons_lit += 1
         self.rate_diminution_light += RATE_DIMINUTION_LIGHT_AUGMENTATION
 
         # Play the sound
@@ -935,8 +1205,8 @@ class WorldExplorerScreen(Screen):
             "start_beacon", stop_other_sounds=True)
 
         # Change the parameters
-        self.progress_bar_beacon.value = MAX_INTENSITY
         self.beacon_life = MAX_INTENSITY
+        self.update_progress_bar_beacon()
 
         # Remove the previous beacon
         self.grid_map.set_tile_type(
@@ -951,33 +1221,48 @@ class WorldExplorerScreen(Screen):
             on_screen_beacon_tile, "b")
         for texture_map in self.textures_map_list[:]:
             if texture_map.position == on_screen_beacon_tile:
-                self.textures_map_list.remove(texture_map)
-                self.remove_widget(texture_map)
+                self.remove_texture_from_map(texture_map)
         self.add_texture_to_map(on_screen_beacon_tile)
 
         # Increase the size of the map
         self.expand_grid_map()
+        self.is_map_dirty = True
 
         # Reload all textures to avoid junction problems
         temp_list = self.textures_map_list[:]
         self.textures_map_list = []
         self.update_textures_map_list(forced_reload=True)
         for widget in temp_list:
-            self.remove_widget(widget)
-
-    def redraw_interface(self):
-        self.remove_widget(self.number_crystals_label)
-        self.add_widget(self.number_crystals_label)
-        self.remove_widget(self.number_crystals_image)
-        self.add_widget(self.number_crystals_image)
-        self.remove_widget(self.progress_bar_beacon)
-        self.add_widget(self.progress_bar_beacon)
-        if DEBUG_MODE:
-            self.remove_widget(self.fps_label)
-            self.add_widget(self.fps_label)
+            self.map_layer.remove_widget(widget)
 
-    def display_tutorial(self, *args):
-        self.is_tutorial = True
+    def update_number_crystals_label(self):
+        """
+        Update the label of the number of crystals if it has changed.
+        """
+        text = str(self.number_crystals[0]) + " / " + str(MAX_CRYSTALS)
+        if self.number_crystals_label.text != text:
+            self.number_crystals_label.text = text
+
+    def update_progress_bar_beacon(self):
+        """
+        Update the progress bar of the beacon when its displayed value changes.
+        """
+        value = max(floor(self.beacon_life), 0)
+        if self.progress_bar_beacon.value != value:
+            self.progress_bar_beacon.value = value
+
+    def display_tutorial(self):
+        """
+        Simulate one step of the tutorial, where the character moves alone.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
         if self.count_frame < WAIT_FRAMES:
             self.list_keyup = []
             self.list_keydown = []
@@ -1017,37 +1302,44 @@ class WorldExplorerScreen(Screen):
             x_movement=x_movement,
             y_movement=y_movement)
         self.interact_with_environment()
-        self.update_darkness_position()
-
-        self.update_map_on_screen_position()
-        self.update_char_on_screen_position()
 
         if not self.is_tutorial:
-            Clock.unschedule(self.display_tutorial)
-            Clock.schedule_interval(self.update, 1 / FPS)
+            self.create_controls()
+            if MOBILE_MODE:
+                self.darkness_circle.change_radius(
+                    self.darkness_circle.radius + START_BEACON_CASES)
 
-            if not MOBILE_MODE:
-                # Create the keyboard to move the character
-                self._keyboard = Window.request_keyboard(
-                    self._keyboard_closed, self, 'text')
-                self._keyboard.bind(on_key_down=self.update_on_key_down)
-                self._keyboard.bind(on_key_up=self.update_on_key_up)
+    def create_controls(self):
+        """
+        Create the controls of the character, at the end of the tutorial.
 
-            self.list_keydown = []
-            self.list_keyup = []
+        Parameters
+        ----------
+        None
 
-            # Create the joystick to move the character
-            if MOBILE_MODE:
-                my_layout_joystick = RelativeLayout()
-                self.add_widget(my_layout_joystick)
-                self.mobile_joystick = MobileJoystick(my_layout_joystick)
+        Returns
+        -------
+        None
+        """
+        if not MOBILE_MODE:
+            # Create the keyboard to move the character
+            self._keyboard = Window.request_keyboard(
+                self._keyboard_closed, self, 'text')
+            self._keyboard.bind(on_key_down=self.update_on_key_down)
+            self._keyboard.bind(on_key_up=self.update_on_key_up)
 
-                my_layout_button = RelativeLayout()
-                self.add_widget(my_layout_button)
-                self.mobile_button = MobileButton(my_layout_button)
+        self.list_keydown = []
+        self.list_keyup = []
 
-                self.darkness_circle.change_radius(
-                    self.darkness_circle.radius + START_BEACON_CASES)
+        # Create the joystick to move the character
+        if MOBILE_MODE:
+            my_layout_joystick = RelativeLayout()
+            self.hud_layer.add_widget(my_layout_joystick)
+            self.mobile_joystick = MobileJoystick(my_layout_joystick)
+
+            my_layout_button = RelativeLayout()
+            self.hud_layer.add_widget(my_layout_button)
+            self.mobile_button = MobileButton(my_layout_button)
 
     ##################################
     ### Controls with the keyboard ###
@@ -1166,21 +1458,31 @@ class WorldExplorerScreen(Screen):
             y_movement = y_movement / SQUARE_TWO
         return x_movement, y_movement
 
-    ######################
-    ### General udpate ###
-    ######################
+    def get_step_inputs(self):
+        """
+        Get the inputs of the user for a step of the game, or those of the
+        replay simulated, and record them.
 
-    def update(self, *args):
+        Parameters
+        ----------
+        None
 
-        # Block the game update if the game is over
-        if self.is_game_over:
-            self.game_over()
-            return
+        Returns
+        -------
+        x_movement: float
+            Movement on the x axis
+
+        y_movement: float
+            Movement on the y axis
+        """
+        if replay_player.is_active:
+            x_movement, y_movement, number_interactions = \
+                replay_player.get_inputs(self.number_game_steps)
+            self.list_keyup = [self.INTERACT_KEY] * number_interactions
+            return x_movement, y_movement
 
-        # Get the last movements of the character
         if MOBILE_MODE:
             x_movement, y_movement = self.mobile_joystick.get_direction()
-            self.mobile_joystick.draw()
         else:
             x_movement, y_movement = self.get_movements_keyboard()
 
@@ -1188,54 +1490,231 @@ class WorldExplorerScreen(Screen):
         if MOBILE_MODE:
             if self.mobile_button.get_state():
                 self.list_keyup = [self.INTERACT_KEY]
-            self.mobile_button.draw()
+
+        replay_recorder.record_inputs(
+            self.number_game_steps, x_movement, y_movement,
+            self.list_keyup.count(self.INTERACT_KEY))
+        return x_movement, y_movement
+
+    ######################
+    ### General udpate ###
+    ######################
+
+    def update_display(self, alpha=1.0):
+        """
+        Update the display of the subsystems whose inputs have changed
+        since the last frame.
+
+        Parameters
+        ----------
+        alpha: float
+            Progression between the last simulation step and the next one,
+            used to interpolate the position of the character
+
+        Returns
+        -------
+        None
+        """
+        if self.is_viewport_dirty:
+            self.rescale_display()
+            self.is_viewport_dirty = False
+
+        char_display_position = (
+            self.x_char_previous +
+            (self.x_char_on_map - self.x_char_previous) * alpha,
+            self.y_char_previous +
+            (self.y_char_on_map - self.y_char_previous) * alpha)
+        if self.char_display_position != char_display_position:
+            self.char_display_position = char_display_position
+            self.is_map_dirty = True
+
+        self.update_near_sounds()
+
+        if self.is_map_dirty:
+            self.update_map_on_screen_position()
+            self.update_textures_map_on_screen()
+            self.is_map_dirty = False
+            self.is_darkness_dirty = True
+
+        if self.is_darkness_dirty:
+            self.update_darkness_position()
+            self.is_darkness_dirty = False
+
+        self.update_char_on_screen_position(alpha)
+
+    def on_viewport_resize(self, *args):
+        self.is_viewport_dirty = True
+
+    def rescale_display(self):
+        """
+        Rescale the widgets of the screen to the new size of the window.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.font_ratio = viewport.font_ratio
+
+        # Rescale the map and the character
+        for texture_map in self.textures_map_list:
+            texture_map.size_hint = self.get_tile_size_hint(
+                texture_map.name_texture)
+        self.character.size_hint = (
+            viewport.character_size / viewport.window_size[0],
+            viewport.character_size / viewport.window_size[1])
+        self.crystal_1.width = viewport.tile_size // 4
+        self.crystal_2.width = viewport.tile_size // 4
+
+        # Rescale the overlays
+        self.darkness_circle.rescale()
+        self.ambient_darkness.rescale()
+        self.number_crystals_label.size_hint = (
+            0.075, 0.05 * viewport.screen_ratio)
+        self.number_crystals_label.font_size = 10 * self.font_ratio
+        self.number_crystals_image.width = 0.03 * viewport.window_size[0]
+        self.number_crystals_image.height = self.number_crystals_image.width
+        if DEBUG_MODE:
+            self.fps_label.font_size = 10 * self.font_ratio
+        if MOBILE_MODE and not self.is_tutorial:
+            self.mobile_joystick.rescale()
+            self.mobile_button.rescale()
+
+        # Display the tiles which now fit on the screen
+        self.update_map_on_screen_position()
+        self.prec_map_center_grid_pos = self.get_map_center_grid_pos()
+        self.update_textures_map_list(forced_reload=True)
+        self.is_map_dirty = True
+
+    def update(self, dt):
+        """
+        Update the screen at each frame.
+
+        The game is simulated with fixed steps, as many as the time elapsed
+        since the last frame requires, so that the speed of the game does not
+        depend on the FPS. The display is then interpolated between the
+        last two steps.
+
+        Parameters
+        ----------
+        dt: float
+            Time elapsed since the last frame, in seconds
+
+        Returns
+        -------
+        None
+        """
+        number_steps = 0
+
+        # Simulate a replay as fast as possible, drawing a frame from time
+        # to time
+        if replay_player.is_active:
+            end_time = time.perf_counter() + REPLAY_FRAME_BUDGET
+            while time.perf_counter() < end_time:
+                self.simulate_step()
+                if not self.is_running:
+                    return
+            self.time_accumulator = 0
+            step_duration = SIMULATION_STEP
+        else:
+            self.time_accumulator += dt
+            step_duration = TUTORIAL_STEP if self.is_tutorial else SIMULATION_STEP
+        while self.time_accumulator >= step_duration:
+            # Drop the late steps to avoid slowing down more a slow device
+            if number_steps == MAX_SIMULATION_STEPS:
+                self.time_accumulator %= step_duration
+                break
+            self.time_accumulator -= step_duration
+            self.simulate_step()
+            number_steps += 1
+            # Stop when the game over has left the screen
+            if not self.is_running:
+                return
+            step_duration = TUTORIAL_STEP if self.is_tutorial else SIMULATION_STEP
+
+        # Draw the controls on mobile
+        if MOBILE_MODE and not self.is_tutorial:
+            self.mobile_joystick.recursive_update()
+            self.mobile_button.recursive_update()
 
         if DEBUG_MODE and self.count_frame % 60 == 0:
             self.fps_label.text = str(round(Clock.get_fps(), 2))
 
+        self.update_display(alpha=self.time_accumulator / step_duration)
+
+        if profiler.is_enabled:
+            self.manager.reach_startup_mark("world_first_update")
+
+    def simulate_step(self):
+        """
+        Simulate one step of the tutorial or of the game.
+        """
+        self.x_char_previous = self.x_char_on_map
+        self.y_char_previous = self.y_char_on_map
+        if self.is_tutorial:
+            self.display_tutorial()
+        else:
+            self.update_game()
+
+    def update_game(self):
+        """
+        Simulate one step of the game.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        # Block the game update if the game is over
+        if self.is_game_over:
+            self.game_over()
+            return
+
+        # Stop when all the steps of the replay have been simulated
+        if replay_player.is_active and replay_player.is_finished(
+                self.number_game_steps):
+            self.finish_replay()
+            return
+
+        # Get the last movements of the character
+        x_movement, y_movement = self.get_step_inputs()
+
         # Increase the frame counter
         self.count_frame += 1
+        self.number_game_steps += 1
 
         # Decrease the intensity of the beacon
         self.beacon_life -= self.rate_diminution_light
-        self.progress_bar_beacon.value = self.beacon_life
-        if self.beacon_life < 0:
+        self.update_progress_bar_beacon()
+        if self.beacon_life < 0 and self.darkness_circle.radius != 0:
             self.grid_map.set_tile_type(
                 position=(floor(self.beacon_position[0]), floor(
                     self.beacon_position[1])),
                 value="R")
             self.darkness_circle.change_radius(0)
 
-        # Manage crystal sound
-        current_map_center_grid_pos = self.get_map_center_grid_pos()
-
-        if self.prec_map_center_grid_pos != current_map_center_grid_pos:
-            self.is_crystal_near = self.search_near_crystal(
-                current_map_center_grid_pos)
-            self.is_beacon_near = self.search_near_off_beacon(
-                current_map_center_grid_pos)
-            self.manage_near_beacon_sound()
-            self.manage_near_crystal_sound()
-
         # Update the position of the character on the map
-        self.update_char_on_map_position(
-            x_movement=x_movement,
-            y_movement=y_movement)
+        if self.update_char_on_map_position(
+                x_movement=x_movement,
+                y_movement=y_movement):
+            self.distance_walked += hypot(
+                self.x_char_on_map - self.x_char_previous,
+                self.y_char_on_map - self.y_char_previous)
 
         # Get the interactions of the character with the environment
         self.manage_in_darkness()
         self.interact_with_environment()
-        self.update_darkness_position()
-
-        self.update_map_on_screen_position()
-        self.update_char_on_screen_position()
 
-        self.redraw_interface()
-
-        sound_mixer.recursive_update()
         # Play randomly the water drops
-        if rd.random() < PROBABILITY_WATER_DROPS:
-            if sound_mixer.musics["flic"].state != "play":
+        if self.random.random() < PROBABILITY_WATER_DROPS:
+            if not sound_mixer.is_playing("flic"):
                 sound_mixer.play("flic", stop_other_sounds=False)
 
 
@@ -1291,59 +1770,3 @@ def load_grid_map(filename: str):
             grid_map.append(tiles)
 
     return grid_map
-
-
-def load_texture(image_file):
-    """
-    Load a texture and create an Image widget in Kivy.
-
-    Parameters
-    ----------
-    image_file: str
-        Name of the image
-
-    Returns
-    -------
-    None
-    """
-    texture = Image(source=image_file).texture
-    texture.mag_filter = "nearest"
-    return texture
-
-
-def load_textures_from_atlas(atlas_name: str):
-    """
-    Load the textures in the atlas, given the name of the atlas.
-
-    Parameters
-    ----------
-    atlas_name: str
-        Name of the atlas
-
-    Returns
-    -------
-    None
-    """
-
-    # Set the global path for the atlas and open it
-    path_atlas = PATH_ATLAS + atlas_name + ".atlas"
-    atlas = Atlas(path_atlas)
-
-    # Extract the textures from the atlas
-    dict_textures = {}
-    for texture in atlas.original_textures:
-        texture.mag_filter = "nearest"
-    for key in atlas.textures:
-        dict_textures[key] = atlas[key]
-
-    return dict_textures
-
-
-###############
-### Process ###
-###############
-
-TEXTURE_DICT = load_textures_from_atlas("map_textures")
-# TEXTURE_DICT["hero"] = load_texture(PATH_CHARACTER_IMAGES + "front.png")
-TEXTURE_DICT["blank"] = load_texture(PATH_IMAGES + "blank.png")
-TEXTURE_DICT.update(load_textures_from_atlas("ghost_textures"))
@@ -1,81 +1,472 @@
 import os
+import shutil
+import hashlib
+import subprocess
+import wave
 
-from math import ceil, sqrt
+from math import ceil
 
 from PIL import Image as PIL_Image
 
-from tools.tools_constants import PATH_ATLAS, DICT_TILES_TEXTURE, PATH_MAP_TEXTURES, PATH_CHARACTER_IMAGES
+from tools.tools_constants import PATH_ATLAS, DICT_TILES_TEXTURE, PATH_MAP_TEXTURES, PATH_CHARACTER_IMAGES, PATH_LOGO, ATLAS_TEXTURE_SIZE, LIST_MIPMAPPED_ATLASES, PATH_SOUNDS, PATH_SOUNDS_PCM
 
-from tools.tools_basis import save_json_file
+from tools.tools_basis import save_json_file, load_json_file
 
 from tools.tools_map import create_new_map, grid_to_string
 
 from tools.tools_world_explorer import load_grid_map
 
+# Maximal side of the pages of the atlases and margin around their images
+ATLAS_MAX_PAGE_SIZE = 2048
+ATLAS_PADDING = 2
+# Margin of the mipmapped atlases, so that the levels down to an eighth of
+# the size do not mix the borders of neighbouring images
+ATLAS_MIPMAP_PADDING = 8
 
-def create_atlas_from_folder(folder_path: str, rescale_size: tuple = None) -> None:
+# Sounds decoded to PCM in the sound bank, with their format. The sample
+# rate of the Kivy SDL2 mixer avoids a resampling when they are loaded.
+SOUND_BANK_MAX_DURATION = 3
+SOUND_BANK_SAMPLE_RATE = 44100
+SOUND_BANK_CHANNELS = 1
+
+
+def pack_rectangles(list_sizes, page_size):
+    """
+    Place rectangles in a page with the MaxRects algorithm.
+
+    Each rectangle is placed in the free area leaving the shortest side
+    unused, and the free areas are split around it.
+
+    Parameters
+    ----------
+    list_sizes: list
+        Sizes (width, height) of the rectangles, in the order to place them
+
+    page_size: (int, int)
+        Size of the page
+
+    Returns
+    -------
+    list
+        Position (x, y) of each rectangle from the top left corner, or None
+        when it does not fit in the page
+    """
+    list_free_rects = [(0, 0, page_size[0], page_size[1])]
+    list_positions = []
+
+    for width, height in list_sizes:
+
+        # Find the free area leaving the shortest side unused
+        best_score = None
+        position = None
+        for free_x, free_y, free_width, free_height in list_free_rects:
+            if width <= free_width and height <= free_height:
+                leftover = sorted(
+                    (free_width - width, free_height - height))
+                if best_score is None or leftover < best_score:
+                    best_score = leftover
+                    position = (free_x, free_y)
+        list_positions.append(position)
+        if position is None:
+            continue
+
+        # Split the free areas overlapping the new rectangle
+        used_x, used_y = position
+        list_split_rects = []
+        for free_rect in list_free_rects:
+            free_x, free_y, free_width, free_height = free_rect
+            if used_x >= free_x + free_width or used_x + width <= free_x or \
+                    used_y >= free_y + free_height or used_y + height <= free_y:
+                list_split_rects.append(free_rect)
+                continue
+            if used_x > free_x:
+                list_split_rects.append(
+                    (free_x, free_y, used_x - free_x, free_height))
+            if used_x + width < free_x + free_width:
+                list_split_rects.append(
+                    (used_x + width, free_y,
+                     free_x + free_width - used_x - width, free_height))
+            if used_y > free_y:
+                list_split_rects.append(
+                    (free_x, free_y, free_width, used_y - free_y))
+            if used_y + height < free_y + free_height:
+                list_split_rects.append(
+                    (free_x, used_y + height,
+                     free_width, free_y + free_height - used_y - height))
+
+        # Remove the free areas contained in another one
+        list_split_rects = list(dict.fromkeys(list_split_rects))
+        list_free_rects = [
+            rect for rect in list_split_rects
+            if not any(other != rect and
+                       other[0] <= rect[0] and other[1] <= rect[1] and
+                       other[0] + other[2] >= rect[0] + rect[2] and
+                       other[1] + other[3] >= rect[1] + rect[3]
+                       for other in list_split_rects)]
+
+    return list_positions
+
+
+def pack_pages(dict_sizes, max_page_size=ATLAS_MAX_PAGE_SIZE):
+    """
+    Distribute rectangles in the smallest power of two pages.
+
+    Parameters
+    ----------
+    dict_sizes: dict
+        Size (width, height) of each rectangle, referenced by its name
+
+    max_page_size: int
+        Maximal side of a page, a power of two
+
+    Returns
+    -------
+    list
+        List of the pages, each one as a tuple of its size and the
+        position of its rectangles, referenced by their name
+    """
+    # Place the largest rectangles first
+    list_names = sorted(
+        dict_sizes,
+        key=lambda name: (max(dict_sizes[name]), dict_sizes[name][0] *
+                          dict_sizes[name][1], name),
+        reverse=True)
+    for name in list_names:
+        if max(dict_sizes[name]) > max_page_size:
+            raise ValueError(
+                f"The image {name} is larger than the page size {max_page_size}")
+
+    list_powers = [2 ** power for power in range(4, max_page_size.bit_length())
+                   if 2 ** power <= max_page_size]
+    list_page_sizes = sorted(
+        ((width, height) for width in list_powers for height in list_powers),
+        key=lambda size: (size[0] * size[1], max(size), -size[0]))
+
+    list_pages = []
+    while list_names:
+        total_area = sum(dict_sizes[name][0] * dict_sizes[name][1]
+                         for name in list_names)
+        list_sizes = [dict_sizes[name] for name in list_names]
+
+        # Use the smallest page containing all the remaining rectangles
+        page = None
+        for page_size in list_page_sizes:
+            if page_size[0] * page_size[1] < total_area:
+                continue
+            list_positions = pack_rectangles(list_sizes, page_size)
+            if None not in list_positions:
+                page = (page_size, list_positions)
+                break
+
+        # Otherwise fill a page of the maximal size and continue
+        if page is None:
+            page_size = (max_page_size, max_page_size)
+            page = (page_size, pack_rectangles(list_sizes, page_size))
+
+        page_size, list_positions = page
+        list_pages.append((page_size, {
+            name: position for name, position in zip(list_names, list_positions)
+            if position is not None}))
+        list_names = [name for name, position in zip(list_names, list_positions)
+                      if position is None]
+
+    return list_pages
+
+
+def paste_with_extrusion(page_texture, image, position, padding):
+    """
+    Paste an image in a page and repeat its borders in the padding, so that
+    the filtering of the texture does not bleed the neighbouring images.
+    """
+    x_coord, y_coord = position[0] + padding, position[1] + padding
+    width, height = image.size
+    page_texture.paste(image, (x_coord, y_coord))
+    if padding == 0:
+        return
+
+    list_borders = [
+        ((0, 0, width, 1), (width, padding), (x_coord, y_coord - padding)),
+        ((0, height - 1, width, height), (width, padding),
+         (x_coord, y_coord + height)),
+        ((0, 0, 1, height), (padding, height), (x_coord - padding, y_coord)),
+        ((width - 1, 0, width, height), (padding, height),
+         (x_coord + width, y_coord)),
+        ((0, 0, 1, 1), (padding, padding),
+         (x_coord - padding, y_coord - padding)),
+        ((width - 1, 0, width, 1), (padding, padding),
+         (x_coord + width, y_coord - padding)),
+        ((0, height - 1, 1, height), (padding, padding),
+         (x_coord - padding, y_coord + height)),
+        ((width - 1, height - 1, width, height), (padding, padding),
+         (x_coord + width, y_coord + height))]
+    for crop_box, border_size, border_position in list_borders:
+        page_texture.paste(
+            image.crop(crop_box).resize(border_size), border_position)
+
+
+def compute_file_hash(file_path):
+    with open(file_path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def create_atlas_from_folder(folder_path: str, rescale_size: int = None,
+                             padding: int = None,
+                             max_page_size: int = ATLAS_MAX_PAGE_SIZE,
+                             force: bool = False) -> bool:
     """
     Create an atlas with pictures contained in a folder.
 
+    The images are packed in the smallest power of two pages. A local cache
+    of the hash of each image, ignored by git, is saved next to the atlas:
+    the atlas is not rebuilt when nothing changed, and the unchanged images
+    are copied from the previous pages instead of being processed again.
+
     Parameters
     ----------
     folder_path: str
         Path to the folder containing the images
 
-    rescale_size: (int, int)
-        Rescale the images
+    rescale_size: int
+        Rescale the images to squares of this size
+
+    padding: int
+        Number of pixels around each image, filled with its borders, by
+        default larger for the mipmapped atlases
+
+    max_page_size: int
+        Maximal side of a page, a power of two
+
+    force: bool
+        Rebuild the atlas even if nothing changed
 
     Returns
     -------
-    None
+    bool
+        Whether the atlas has been rebuilt
     """
 
     # Get the list of files in the folder
-    file_list = os.listdir(folder_path)
+    file_list = sorted(os.listdir(folder_path))
     atlas_name = os.path.basename(folder_path[:-1])
-    atlas_texture_name = atlas_name + ".png"
-
-    # Compute variables to define the atlas
-    nb_pictures = len(file_list)
-    nb_textures_on_side = ceil(sqrt(nb_pictures))
-    if rescale_size is None:
-        image = PIL_Image.open(folder_path + file_list[0])
-        rescale_size = image.size[0]
-
-    # Create the atlas texture
-    atlas_side = rescale_size * nb_textures_on_side
-    atlas_size = (atlas_side,
-                  atlas_side)
-    atlas_texture = PIL_Image.new(mode="RGBA",
-                                  size=atlas_size)
+    path_atlas = PATH_ATLAS + atlas_name + ".atlas"
+    path_cache = PATH_ATLAS + atlas_name + ".cache"
+    if padding is None:
+        padding = ATLAS_MIPMAP_PADDING \
+            if atlas_name in LIST_MIPMAPPED_ATLASES else ATLAS_PADDING
 
-    # Create the atlas dict
-    atlas_dict = {atlas_texture_name: {}}
-
-    # Create the atlas
-    for i, file in enumerate(file_list):
+    # Compare the images and the options with the previous build
+    dict_options = {
+        "rescale_size": rescale_size,
+        "padding": padding,
+        "max_page_size": max_page_size
+    }
+    dict_hashes = {file: compute_file_hash(folder_path + file)
+                   for file in file_list}
+    cache = {"options": None, "hashes": {}, "regions": {}}
+    if os.path.exists(path_cache) and os.path.exists(path_atlas):
+        cache = load_json_file(path_cache)
+    dict_old_pages = {}
+    if cache["options"] == dict_options and all(
+            os.path.exists(PATH_ATLAS + page_name)
+            for page_name in load_json_file(path_atlas)):
+        if not force and cache["hashes"] == dict_hashes:
+            print(f"{atlas_name}: up to date")
+            return False
+        dict_old_pages = {page_name: PIL_Image.open(PATH_ATLAS + page_name)
+                          for page_name in load_json_file(path_atlas)}
 
-        # Extract the name of the file
+    # Prepare the images, copying the unchanged ones from the old pages
+    dict_images = {}
+    number_reused = 0
+    for file in file_list:
         file_name = file.split(".")[0]
+        if dict_old_pages and cache["hashes"].get(file) == dict_hashes[file]:
+            page_name, x_coord, y_coord, width, height = cache["regions"][file_name]
+            dict_images[file_name] = dict_old_pages[page_name].crop(
+                (x_coord, y_coord, x_coord + width, y_coord + height))
+            number_reused += 1
+            continue
+
+        image = PIL_Image.open(folder_path + file).convert("RGBA")
+        if rescale_size is not None:
+            image = image.resize((rescale_size, rescale_size))
+        dict_images[file_name] = image
 
-        # Open the image
-        image = PIL_Image.open(folder_path + file)
-        image = image.resize((rescale_size, rescale_size))
+    # Pack the images in the pages
+    list_pages = pack_pages(
+        {name: (image.size[0] + 2 * padding, image.size[1] + 2 * padding)
+         for name, image in dict_images.items()},
+        max_page_size=max_page_size)
 
-        # Compute its coordinates
-        x_coord = (i % nb_textures_on_side) * rescale_size
-        y_coord = (i // nb_textures_on_side) * rescale_size
-        texture_box_PIL = [x_coord, y_coord, rescale_size, rescale_size]
-        texture_box_atlas = [x_coord,
-                             atlas_side - y_coord - rescale_size, rescale_size, rescale_size]
-        atlas_texture.paste(image,
-                            texture_box_PIL[:2])
+    # Remove the previous pages
+    if os.path.exists(path_atlas):
+        for page_name in load_json_file(path_atlas):
+            if os.path.exists(PATH_ATLAS + page_name):
+                os.remove(PATH_ATLAS + page_name)
 
-        # Add the texture to the atlas
-        atlas_dict[atlas_texture_name][file_name] = texture_box_atlas
+    # Create the pages and the atlas dict
+    atlas_dict = {}
+    dict_regions = {}
+    for page_id, (page_size, dict_positions) in enumerate(list_pages):
+        page_name = atlas_name + ".png" if len(list_pages) == 1 else \
+            atlas_name + "-" + str(page_id) + ".png"
+        page_texture = PIL_Image.new(mode="RGBA", size=page_size)
+        atlas_dict[page_name] = {}
+        for name, position in sorted(dict_positions.items()):
+            image = dict_images[name]
+            paste_with_extrusion(page_texture, image, position, padding)
+            x_coord, y_coord = position[0] + padding, position[1] + padding
+            dict_regions[name] = [page_name, x_coord, y_coord,
+                                  image.size[0], image.size[1]]
+
+            # Add the texture to the atlas, with the origin at the bottom
+            atlas_dict[page_name][name] = [
+                x_coord,
+                page_size[1] - y_coord - image.size[1],
+                image.size[0],
+                image.size[1]]
+        page_texture.save(PATH_ATLAS + page_name, optimize=True)
 
     # Save the atlas
-    atlas_texture.save(PATH_ATLAS + atlas_name + ".png")
+    save_json_file(path_atlas, atlas_dict)
+    save_json_file(path_cache, {
+        "options": dict_options,
+        "hashes": dict_hashes,
+        "regions": dict_regions
+    })
+
+    pages_description = ", ".join(
+        f"{page_size[0]}x{page_size[1]}" for page_size, _ in list_pages)
+    print(f"{atlas_name}: {len(list_pages)} page(s) {pages_description}, "
+          f"{number_reused} unchanged image(s) reused")
+    return True
+
+
+def create_sound_bank(folder_path: str = PATH_SOUNDS,
+                      max_duration: float = SOUND_BANK_MAX_DURATION,
+                      force: bool = False) -> None:
+    """
+    Decode the short sounds of a folder to PCM WAV files.
+
+    The game loads the WAV files of PATH_SOUNDS_PCM instead of the
+    compressed sounds of the same name, so that they do not need to be
+    decoded. The long sounds stay compressed to keep the package light.
+    It requires ffmpeg, and skips the files it cannot decode.
+
+    Parameters
+    ----------
+    folder_path: str
+        Path to the folder containing the compressed sounds
+
+    max_duration: float
+        Maximal duration in seconds of the sounds to decode
+
+    force: bool
+        Decode the sounds again even if they did not change
+
+    Returns
+    -------
+    None
+    """
+    if shutil.which("ffmpeg") is None:
+        print("ffmpeg is required to create the sound bank")
+        return
+    os.makedirs(PATH_SOUNDS_PCM, exist_ok=True)
+
+    for file in sorted(os.listdir(folder_path)):
+        path_sound = folder_path + file
+        path_wav = PATH_SOUNDS_PCM + file.split(".")[0] + ".wav"
+        if not force and os.path.exists(path_wav) and \
+                os.path.getmtime(path_wav) >= os.path.getmtime(path_sound):
+            continue
+
+        # Decode the sound to know its duration
+        path_decoded = path_wav + ".tmp"
+        process = subprocess.run(
+            ["ffmpeg", "-y", "-v", "error", "-i", path_sound,
+             "-ac", str(SOUND_BANK_CHANNELS),
+             "-ar", str(SOUND_BANK_SAMPLE_RATE),
+             "-c:a", "pcm_s16le", "-f", "wav", path_decoded],
+            capture_output=True, text=True, check=False)
+        if process.returncode != 0:
+            print(f"{file}: skipped, not decoded by ffmpeg "
+                  f"({process.stderr.strip()})")
+            if os.path.exists(path_decoded):
+                os.remove(path_decoded)
+            continue
+        with wave.open(path_decoded, "rb") as wave_file:
+            duration = wave_file.getnframes() / wave_file.getframerate()
+
+        # Keep the long sounds compressed
+        if duration > max_duration:
+            os.remove(path_decoded)
+            if os.path.exists(path_wav):
+                os.remove(path_wav)
+            continue
+
+        os.replace(path_decoded, path_wav)
+        print(f"{file}: {duration:.2f} s decoded to {path_wav}")
+
+
+def create_logo_atlas(folder_path: str, frames_on_side: int = 5) -> None:
+    """
+    Pack the frames of the logo animation in the pages of an atlas.
+
+    The frames are named in the order of display, so that the animation
+    can be played by decoding the pages one after the other.
+
+    Parameters
+    ----------
+    folder_path: str
+        Path to the folder containing the frames
+
+    frames_on_side: int
+        Number of frames on each side of a page
+
+    Returns
+    -------
+    None
+    """
+
+    # Sort the frames in the order of display
+    file_list = os.listdir(folder_path)
+    file_list.sort(key=lambda file:
+                   int(file[-7:-4].replace("k", "").replace("_", "")),
+                   reverse=True)
+    atlas_name = os.path.basename(folder_path[:-1])
+    frame_size = PIL_Image.open(folder_path + file_list[0]).size
+    frames_per_page = frames_on_side * frames_on_side
+
+    # Create the atlas dict
+    atlas_dict = {}
+
+    for page_id in range(ceil(len(file_list) / frames_per_page)):
+        page_files = file_list[page_id * frames_per_page:
+                               (page_id + 1) * frames_per_page]
+        page_name = atlas_name + "-" + str(page_id) + ".png"
+        page_texture = PIL_Image.new(
+            mode="RGBA",
+            size=(frame_size[0] * frames_on_side,
+                  frame_size[1] * frames_on_side))
+        atlas_dict[page_name] = {}
+
+        for i, file in enumerate(page_files):
+            x_coord = (i % frames_on_side) * frame_size[0]
+            y_coord = (i // frames_on_side) * frame_size[1]
+            page_texture.paste(PIL_Image.open(folder_path + file),
+                               (x_coord, y_coord))
+
+            # Add the frame to the atlas, with the origin at the bottom
+            frame_name = "frame_" + \
+                str(page_id * frames_per_page + i).zfill(3)
+            atlas_dict[page_name][frame_name] = [
+                x_coord,
+                page_texture.size[1] - y_coord - frame_size[1],
+                frame_size[0],
+                frame_size[1]]
+
+        page_texture.save(PATH_ATLAS + page_name, optimize=True)
+
     save_json_file(PATH_ATLAS + atlas_name + ".atlas", atlas_dict)
 
 
@@ -103,8 +494,13 @@ def create_map_single_image(grid_map, tile_size, image_folder_path):
     map_texture.save("map.png")
 
 
-create_atlas_from_folder(folder_path=PATH_MAP_TEXTURES, rescale_size=100)
-create_atlas_from_folder(folder_path=PATH_CHARACTER_IMAGES, rescale_size=100)
+if __name__ == "__main__":
+    create_atlas_from_folder(
+        folder_path=PATH_MAP_TEXTURES, rescale_size=ATLAS_TEXTURE_SIZE)
+    create_atlas_from_folder(
+        folder_path=PATH_CHARACTER_IMAGES, rescale_size=ATLAS_TEXTURE_SIZE)
+    create_logo_atlas(folder_path=PATH_LOGO)
+    create_sound_bank()
 
 # grid_map = create_new_map(True, [])
 # # # grid_map = load_grid_map("magic_forest")